@@ -0,0 +1,128 @@
+"""
+Compact Store Module for Contacts API
+
+A plain dictionary of contact dictionaries spends most of its memory on object
+overhead: every contact carries its own dict plus three separate str objects.
+This module provides CompactContacts, a drop-in replacement for that dictionary
+which packs each contact into a single bytes object.
+
+Each packed row holds the UTF-8 encoded name, phone and email preceded by their
+lengths. The name is left out when it is the same as the contact's key, which is
+the usual case. Reading a contact decodes its row into a fresh dictionary, so
+API responses look exactly as before.
+
+Classes:
+    CompactContacts: Dictionary-like store of packed contact records
+    CompactItemsView: The items() view of CompactContacts
+"""
+
+from collections.abc import ItemsView, MutableMapping
+import struct
+
+# Row header: name length (or SAME_AS_KEY), phone length
+HEADER = struct.Struct("<II")
+SAME_AS_KEY = 0xFFFFFFFF
+
+class CompactContacts(MutableMapping):
+    """
+    Dictionary of contact records stored as packed bytes rows.
+
+    Supports the usual dict operations (in, [], len, iteration, pop, items).
+    Looking a contact up returns a new {"name", "phone", "email"} dictionary;
+    changing that dictionary does not change the store.
+
+    Attributes:
+        rows (dict): key -> packed bytes row
+    """
+
+    def __init__(self, contacts=None):
+        self.rows = {}
+        if contacts:
+            self.update(contacts)
+
+    @staticmethod
+    def pack(key: str, contact: dict) -> bytes:
+        """
+        Pack a contact record into a bytes row.
+
+        Args:
+            key (str): The contact's key
+            contact (dict): Record with "name", "phone" and "email" strings
+
+        Returns:
+            bytes: The packed row
+        """
+        name = contact["name"]
+        phone = contact["phone"].encode("utf-8")
+        email = contact["email"].encode("utf-8")
+        if name == key:
+            return HEADER.pack(SAME_AS_KEY, len(phone)) + phone + email
+        name = name.encode("utf-8")
+        return HEADER.pack(len(name), len(phone)) + name + phone + email
+
+    @staticmethod
+    def unpack(key: str, row: bytes) -> dict:
+        """
+        Unpack a bytes row into a contact record.
+
+        Args:
+            key (str): The contact's key
+            row (bytes): The packed row
+
+        Returns:
+            dict: Record with "name", "phone" and "email"
+        """
+        name_length, phone_length = HEADER.unpack_from(row)
+        position = HEADER.size
+        if name_length == SAME_AS_KEY:
+            name = key
+        else:
+            name = row[position:position + name_length].decode("utf-8")
+            position += name_length
+        phone = row[position:position + phone_length].decode("utf-8")
+        email = row[position + phone_length:].decode("utf-8")
+        return {"name": name, "phone": phone, "email": email}
+
+    def __getitem__(self, key: str) -> dict:
+        return self.unpack(key, self.rows[key])
+
+    def __setitem__(self, key: str, contact: dict) -> None:
+        self.rows[key] = self.pack(key, contact)
+
+    def __delitem__(self, key: str) -> None:
+        del self.rows[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self.rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def clear(self) -> None:
+        self.rows.clear()
+
+    def copy(self) -> "CompactContacts":
+        """Return a shallow copy; rows are immutable bytes, so they are shared."""
+        copied = CompactContacts()
+        copied.rows = self.rows.copy()
+        return copied
+
+    def items(self) -> "CompactItemsView":
+        """Return a view of (key, record) pairs that decodes each row once."""
+        return CompactItemsView(self)
+
+class CompactItemsView(ItemsView):
+    """
+    Items view of CompactContacts.
+
+    Behaves like dict.items() (len, in, set operations, repeated iteration);
+    iterating decodes each row once instead of looking every key up again.
+    """
+
+    def __iter__(self):
+        unpack = self._mapping.unpack
+        for key, row in self._mapping.rows.items():
+            yield key, unpack(key, row)
@@ -3,25 +3,75 @@ Contacts API
 
 A FastAPI application for managing contacts using in-memory storage.
 Provides basic CRUD operations for contact management with search functionality.
+Contacts are persisted by the store selected with CONTACTS_STORAGE (see storage.py):
+a write-ahead log with snapshots by default, or a shared SQLite database so several
+uvicorn workers serve the same data.
 
 Endpoints:
     POST /contacts/ - Create a new contact
     GET /contacts/ - List all contacts or search by name
+    GET /contacts/search?q= - Prefix, substring and typo-tolerant search
     PUT /contacts/{name} - Update a contact
     DELETE /contacts/{name} - Delete a contact
+    GET /metrics - Request latency and file I/O metrics (Prometheus format)
 """
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException
 from pydantic import BaseModel
+import os
+import sys
+import threading
+
+# The shared service_metrics and service_storage packages live next to this service's directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from service_metrics import install_metrics
+from search_index import ContactIndex
+from storage import SqliteStore, open_store, store_contact
+from compact_store import CompactContacts
+
+# In-memory storage for contacts, loaded from and persisted by the contact store.
+# Records are packed into bytes rows (see compact_store.py) to save memory.
+CONTACTS_STORAGE = os.environ.get("CONTACTS_STORAGE", "wal")
+contact_store = open_store(CONTACTS_STORAGE)
+contacts = contact_store.load(CompactContacts())
+
+# Search index over contact names, phones and emails, kept in sync with contacts
+contact_index = ContactIndex()
+contact_index.rebuild(contacts)
+
+# Held while the store, the dictionary and the index are changed together
+contacts_lock = threading.RLock()
+
+def sync_contacts():
+    """
+    Apply contact changes made by other workers before handling a request.
+
+    Only the SQLite store reports such changes, so this runs only with that store.
+    """
+    with contacts_lock:
+        changes = contact_store.changes()
+        if changes is None:
+            # Too far behind the change feed, reload everything
+            contacts.clear()
+            contact_store.load(contacts)
+            contact_index.rebuild(contacts)
+            return
+        for op, key, contact in changes:
+            if op == "put":
+                if store_contact(contacts, key, contact):
+                    contact_index.add(key, contact)
+            else:
+                contacts.pop(key, None)
+                contact_index.remove(key)
 
 app = FastAPI(
     title="Contacts API",
     description="Simple contact management API with in-memory storage",
-    version="1.0.0"
+    version="1.0.0",
+    # Only the SQLite store is shared with other workers
+    dependencies=[Depends(sync_contacts)] if isinstance(contact_store, SqliteStore) else []
 )
-
-# In-memory storage for contacts
-contacts = {}
+install_metrics(app, "contacts")
 
 class Contact(BaseModel):
     """
@@ -36,6 +86,30 @@ class Contact(BaseModel):
     phone: str
     email: str
 
+def contact_record(contact: Contact) -> dict:
+    """
+    Return a contact's fields as a record, checking they can be stored.
+
+    Records are logged before they are packed into the dictionary, so text the
+    packed rows cannot encode must be refused up front.
+
+    Args:
+        contact (Contact): The contact information
+
+    Returns:
+        dict: Record with "name", "phone" and "email"
+
+    Raises:
+        HTTPException: 400 if a field is not valid UTF-8 text (such as a lone surrogate)
+    """
+    record = contact.dict()
+    try:
+        for value in record.values():
+            value.encode("utf-8")
+    except UnicodeEncodeError:
+        raise HTTPException(status_code=400, detail="Contact fields must be valid UTF-8 text")
+    return record
+
 @app.post("/contacts/")
 def create_contact(contact: Contact):
     """
@@ -47,6 +121,9 @@ def create_contact(contact: Contact):
     Returns:
         dict: Success/error message and contact details
 
+    Raises:
+        HTTPException: If a field is not valid UTF-8 text
+
     Example:
         POST /contacts/
         Body: {
@@ -55,12 +132,16 @@ def create_contact(contact: Contact):
             "email": "john@example.com"
         }
     """
-    # Check if contact already exists
-    if contact.name in contacts:
-        return {"message": "Contact already exists"}
+    record = contact_record(contact)
+    with contacts_lock:
+        # Check if contact already exists
+        if contact.name in contacts:
+            return {"message": "Contact already exists"}
 
-    # Add new contact to our dictionary
-    contacts[contact.name] = contact.dict()
+        # Log the new contact, then add it to our dictionary
+        contact_store.put(contact.name, record)
+        contacts[contact.name] = record
+        contact_index.add(contact.name, record)
 
     return {"message": "Contact created!", "contact": contact}
 
@@ -88,6 +169,30 @@ def get_contacts(name: str = None):
     # If no name provided, return all contacts
     return contacts
 
+@app.get("/contacts/search")
+def search_contacts(q: str, limit: int = 10, fuzzy: bool = True):
+    """
+    Search contacts by name, phone or email as you type.
+
+    Matching is case-insensitive. Contacts whose fields start with the query
+    come first, then contacts whose fields contain it, then (unless fuzzy is
+    false) contacts with a word within one typo of it.
+
+    Args:
+        q (str): Text to search for
+        limit (int): Maximum number of contacts to return
+        fuzzy (bool): Whether to include typo-tolerant matches
+
+    Returns:
+        list: Matching contacts, best matches first
+
+    Example:
+        GET /contacts/search?q=jo
+        GET /contacts/search?q=jhon&fuzzy=true
+    """
+    with contacts_lock:
+        return [contacts[key] for key in contact_index.search(q, limit, fuzzy)]
+
 @app.put("/contacts/{name}")
 def update_contact(name: str, contact: Contact):
     """
@@ -100,6 +205,9 @@ def update_contact(name: str, contact: Contact):
     Returns:
         dict: Success/error message and updated contact
 
+    Raises:
+        HTTPException: If a field is not valid UTF-8 text
+
     Example:
         PUT /contacts/John
         Body: {
@@ -108,12 +216,16 @@ def update_contact(name: str, contact: Contact):
             "email": "johndoe@example.com"
         }
     """
-    # Check if contact exists
-    if name not in contacts:
-        return {"message": "Contact not found"}
+    record = contact_record(contact)
+    with contacts_lock:
+        # Check if contact exists
+        if name not in contacts:
+            return {"message": "Contact not found"}
 
-    # Update contact information
-    contacts[name] = contact.dict()
+        # Log and update contact information
+        contact_store.put(name, record)
+        contacts[name] = record
+        contact_index.add(name, record)
 
     return {"message": "Contact updated!", "contact": contacts[name]}
 
@@ -131,10 +243,13 @@ def delete_contact(name: str):
     Example:
         DELETE /contacts/John
     """
-    # Check if contact exists
-    if name not in contacts:
-        return {"message": "Contact not found"}
-
-    # Remove contact from dictionary
-    deleted_contact = contacts.pop(name)
+    with contacts_lock:
+        # Check if contact exists
+        if name not in contacts:
+            return {"message": "Contact not found"}
+
+        # Log the deletion, then remove contact from dictionary
+        contact_store.delete(name)
+        deleted_contact = contacts.pop(name)
+        contact_index.remove(name)
     return {"message": "Contact deleted!", "contact": deleted_contact}
@@ -0,0 +1,440 @@
+"""
+Search Index Module for Contacts API
+
+This module keeps a search index over the name, phone and email of every contact
+so type-ahead queries do not have to scan the whole contacts dictionary.
+
+Three kinds of matches are supported, all case-insensitive:
+    - prefix: a field starts with the query (sorted buckets + binary search)
+    - substring: a field contains the query (trigram index)
+    - fuzzy: a word of a field is within one typo (a wrong, missing, extra or
+      swapped character) of the query (deletion-neighbourhood index over words)
+
+Fuzzy matching only looks at alphabetic words of at least 3 letters, so phone
+numbers and email local parts such as "jdoe42" are matched by prefix and
+substring only.
+
+The index holds no copies of the field values. Each indexed contact gets an
+integer id, the trigram and word postings are compact arrays of 32-bit ids, and
+prefix search keeps the (id, field) references of every value in sorted buckets
+of about BUCKET_SIZE entries. Field values are read back from the contacts
+mapping whenever they are needed, so adding a contact only shifts one small
+bucket. Removing a contact only marks its id as dead. Once dead ids outnumber
+live ones, a new index is built in a background thread from a copy of the
+mapping. Changes made meanwhile are logged and replayed onto the new index
+(and its copy): first by the thread, then a few at a time by each add() or
+remove(), which switches to the new index once nothing is left to replay.
+Writes therefore never wait for a whole rebuild, at the cost of holding two
+indexes while one is built.
+
+Classes:
+    ContactIndex: Prefix, substring and typo-tolerant index over contacts
+
+Functions:
+    trigrams(text): Return the set of 3-character substrings of a string
+    deletes(word): Return a word and every variant with one character removed
+    edit_distance(a, b): Edit distance counting adjacent swaps as one edit
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, deque
+import re
+import threading
+
+SEARCH_FIELDS = ("name", "phone", "email")
+WORD_SPLIT = re.compile(r"[^a-z]+")
+
+# Words shorter than this are not matched fuzzily; one typo in a 2-letter word
+# matches almost anything
+FUZZY_MIN_LENGTH = 3
+
+# Compact the postings once there are more dead ids than this and than live ones
+COMPACT_MIN_DEAD = 1000
+
+# Logged changes each add() or remove() replays onto a compacted index before
+# it is switched to; more than one, so the log shrinks even under steady writes
+COMPACT_REPLAY_BATCH = 32
+
+# Values are sorted in groups sharing this many leading characters, which gives
+# the same order as one sort but never holds the GIL for long
+SORT_PREFIX = 4
+
+# Target number of value references per prefix bucket; a bucket is split in two
+# when it grows past twice this
+BUCKET_SIZE = 64
+
+# A value reference packs an id and the index of its field in SEARCH_FIELDS
+FIELD_BITS = 2
+
+def trigrams(text: str) -> set:
+    """
+    Return the set of 3-character substrings of a string.
+
+    Args:
+        text (str): The text to split
+
+    Returns:
+        set: Trigrams of the text (empty if shorter than 3 characters)
+    """
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def deletes(word: str) -> set:
+    """
+    Return a word and every variant of it with one character removed.
+
+    Two words within one typo of each other always share at least one of these
+    variants, which is what makes the fuzzy lookup cheap.
+
+    Args:
+        word (str): The word
+
+    Returns:
+        set: The word and its single-deletion variants
+    """
+    return {word} | {word[:i] + word[i + 1:] for i in range(len(word))}
+
+def edit_distance(a: str, b: str) -> int:
+    """
+    Compute the edit distance between two strings.
+
+    Insertions, deletions, substitutions and swaps of two adjacent characters
+    each count as one edit (optimal string alignment distance).
+
+    Args:
+        a (str): First string
+        b (str): Second string
+
+    Returns:
+        int: The number of edits needed to turn a into b
+    """
+    rows = [list(range(len(b) + 1))]
+    for i in range(1, len(a) + 1):
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            row[j] = min(rows[i - 1][j] + 1, row[j - 1] + 1, rows[i - 1][j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], rows[i - 2][j - 2] + 1)
+        rows.append(row)
+    return rows[-1][-1]
+
+class ContactIndex:
+    """
+    Search index over contact names, phone numbers and emails.
+
+    Contacts are identified by their key in the contacts mapping given to
+    rebuild(), and field values are read from that mapping. Call add() after
+    storing a contact in the mapping and remove() once it is gone from it.
+    The index is not thread-safe: the caller serialises these calls and searches,
+    and must not change the mapping while add() or remove() runs (they may copy it).
+
+    Attributes:
+        contacts (Mapping): key -> contact record, the indexed contacts
+        ids (dict): key -> id of its live entry
+        keys (list): id -> key, or None once the entry is dead
+        buckets (list): Sorted runs of value references (id << FIELD_BITS | field),
+            together ordered by value, for prefix search
+        bounds (list): Smallest value of each bucket when it was created
+        grams (dict): trigram -> array of ids whose fields contain it
+        words (dict): alphabetic word -> array of ids whose fields contain it
+        variants (dict): single-deletion variant -> the word producing it, or a
+            tuple of words when several do
+        dead (int): Number of dead ids still referenced by postings
+    """
+
+    def __init__(self):
+        self.contacts = {}
+        self._reset()
+        # Background compaction in progress: {"journal": (key, contact or None)
+        # changes since it started, "index": the new index once built}
+        self._compaction = None
+
+    def _reset(self) -> None:
+        self.ids = {}
+        self.keys = []
+        self.buckets = [array("i")]
+        self.bounds = [""]
+        self.grams = {}
+        self.words = {}
+        self.variants = {}
+        self.dead = 0
+
+    def _field_values(self, contact: dict) -> list:
+        """Return (field index, lowercased value) of each non-empty search field."""
+        return [
+            (field, str(contact[name]).lower())
+            for field, name in enumerate(SEARCH_FIELDS)
+            if contact.get(name)
+        ]
+
+    def _value(self, ref: int) -> str:
+        """Read the lowercased field value a reference points at from the contacts."""
+        contact = self.contacts[self.keys[ref >> FIELD_BITS]]
+        return str(contact[SEARCH_FIELDS[ref & ((1 << FIELD_BITS) - 1)]]).lower()
+
+    def _add_variants(self, word: str) -> None:
+        """Register the single-deletion variants of a newly indexed word."""
+        for variant in deletes(word):
+            # Most variants come from one word; a bare str saves a set per variant
+            shared = self.variants.get(variant)
+            if shared is None:
+                self.variants[variant] = word
+            elif isinstance(shared, str):
+                self.variants[variant] = (shared, word)
+            else:
+                self.variants[variant] = shared + (word,)
+
+    def _post(self, key: str, values: list) -> int:
+        """Assign an id to a contact and add it to the trigram and word postings."""
+        entry_id = len(self.keys)
+        self.ids[key] = entry_id
+        self.keys.append(key)
+
+        grams = set()
+        words = set()
+        for _, value in values:
+            grams.update(trigrams(value))
+            words.update(WORD_SPLIT.split(value))
+        for gram in grams:
+            postings = self.grams.get(gram)
+            if postings is None:
+                postings = self.grams[gram] = array("i")
+            postings.append(entry_id)
+        for word in words:
+            if len(word) < FUZZY_MIN_LENGTH:
+                continue
+            postings = self.words.get(word)
+            if postings is None:
+                postings = self.words[word] = array("i")
+                self._add_variants(word)
+            postings.append(entry_id)
+        return entry_id
+
+    def rebuild(self, contacts) -> None:
+        """
+        Index a whole contacts mapping at once.
+
+        This sorts once instead of inserting contacts one by one, which is much
+        faster when loading a large directory. The mapping is kept and read from
+        by later searches.
+
+        Args:
+            contacts (Mapping): key -> contact record
+        """
+        # A compaction started before this would replace the new contents
+        self._compaction = None
+        self.contacts = contacts
+        self._reset()
+        # Same postings as _post() builds, with the per-trigram work kept to a minimum
+        grams = defaultdict(lambda: array("i"))
+        words = defaultdict(lambda: array("i"))
+        for entry_id, (key, contact) in enumerate(contacts.items()):
+            values = self._field_values(contact)
+            self.ids[key] = entry_id
+            self.keys.append(key)
+            for gram in {value[i:i + 3] for _, value in values for i in range(len(value) - 2)}:
+                grams[gram].append(entry_id)
+            for word in {word for _, value in values for word in WORD_SPLIT.split(value)}:
+                if len(word) >= FUZZY_MIN_LENGTH:
+                    words[word].append(entry_id)
+        self.grams = dict(grams)
+        self.words = dict(words)
+        for word in self.words:
+            self._add_variants(word)
+
+        # Sort the value references in a second pass: if the temporary sort keys
+        # were allocated between the postings above, the memory they free could
+        # not be given back
+        groups = defaultdict(list)
+        for entry_id, contact in enumerate(contacts.values()):
+            for field, value in self._field_values(contact):
+                groups[value[:SORT_PREFIX]].append((value, entry_id << FIELD_BITS | field))
+        refs = array("i")
+        for prefix in sorted(groups):
+            refs.extend(ref for _, ref in sorted(groups.pop(prefix)))
+        if refs:
+            self.buckets = [refs[i:i + BUCKET_SIZE] for i in range(0, len(refs), BUCKET_SIZE)]
+            self.bounds = [""] + [self._value(bucket[0]) for bucket in self.buckets[1:]]
+
+    def _insert(self, value: str, ref: int) -> None:
+        """Insert a value reference into its bucket, dropping the bucket's dead references."""
+        number = bisect_right(self.bounds, value) - 1
+        bucket = array("i", (old for old in self.buckets[number] if self.keys[old >> FIELD_BITS] is not None))
+        low, high = 0, len(bucket)
+        while low < high:
+            middle = (low + high) // 2
+            if self._value(bucket[middle]) <= value:
+                low = middle + 1
+            else:
+                high = middle
+        bucket.insert(low, ref)
+
+        if len(bucket) > 2 * BUCKET_SIZE:
+            half = len(bucket) // 2
+            self.buckets[number:number + 1] = [bucket[:half], bucket[half:]]
+            self.bounds.insert(number + 1, self._value(bucket[half]))
+        else:
+            self.buckets[number] = bucket
+
+    def _drop(self, key: str) -> None:
+        entry_id = self.ids.pop(key, None)
+        if entry_id is not None:
+            self.keys[entry_id] = None
+            self.dead += 1
+
+    def _index(self, key: str, contact: dict) -> None:
+        self._drop(key)
+        values = self._field_values(contact)
+        entry_id = self._post(key, values)
+        for field, value in values:
+            self._insert(value, entry_id << FIELD_BITS | field)
+
+    def _apply(self, key: str, contact) -> None:
+        """Apply a logged change to this index and to its own copy of the contacts."""
+        if contact is None:
+            self.contacts.pop(key, None)
+            self._drop(key)
+        else:
+            self.contacts[key] = contact
+            self._index(key, contact)
+
+    def _changed(self, key: str, contact) -> None:
+        """Log a change for a running compaction; start or finish one when it is due."""
+        compaction = self._compaction
+        if compaction is not None:
+            compaction["journal"].append((key, contact))
+            if compaction["index"] is not None:
+                self._catch_up(compaction)
+        elif self.dead > COMPACT_MIN_DEAD and self.dead > len(self.ids):
+            self._start_compaction()
+
+    def _start_compaction(self) -> None:
+        """Build an index without dead ids from a copy of the contacts, in a background thread."""
+        compaction = {"journal": deque(), "index": None}
+        snapshot = self.contacts.copy()
+
+        def build():
+            index = ContactIndex()
+            index.rebuild(snapshot)
+            # Replay the changes made while building; later ones are left to the writers
+            journal = compaction["journal"]
+            for _ in range(len(journal)):
+                index._apply(*journal.popleft())
+            compaction["index"] = index
+
+        self._compaction = compaction
+        threading.Thread(target=build, name="contact-index-compaction", daemon=True).start()
+
+    def _catch_up(self, compaction: dict) -> None:
+        """Replay a few logged changes onto the compacted index; switch to it once none are left."""
+        index = compaction["index"]
+        journal = compaction["journal"]
+        for _ in range(min(len(journal), COMPACT_REPLAY_BATCH)):
+            index._apply(*journal.popleft())
+        if journal:
+            return
+
+        self._compaction = None
+        self.ids, self.keys, self.dead = index.ids, index.keys, index.dead
+        self.buckets, self.bounds = index.buckets, index.bounds
+        self.grams, self.words, self.variants = index.grams, index.words, index.variants
+
+    def add(self, key: str, contact: dict) -> None:
+        """
+        Index a contact, replacing any previous entry for the same key.
+
+        Call this after the contact is stored in the contacts mapping.
+
+        Args:
+            key (str): The contact's key in the contacts mapping
+            contact (dict): The contact record
+        """
+        self._index(key, contact)
+        self._changed(key, contact)
+
+    def remove(self, key: str) -> None:
+        """
+        Drop a contact from the index.
+
+        Args:
+            key (str): The contact's key in the contacts mapping
+        """
+        self._drop(key)
+        self._changed(key, None)
+
+    def _prefix(self, query: str, limit: int, found: dict) -> None:
+        # Start in the last bucket created below the query; earlier ones hold smaller values only
+        number = max(bisect_left(self.bounds, query) - 1, 0)
+        for bucket in self.buckets[number:]:
+            for ref in bucket:
+                key = self.keys[ref >> FIELD_BITS]
+                if key is None:
+                    continue
+                value = self._value(ref)
+                if value < query:
+                    continue
+                if not value.startswith(query) or len(found) >= limit:
+                    return
+                found.setdefault(key, None)
+
+    def _substring(self, query: str, limit: int, found: dict) -> None:
+        # Only the rarest trigram is scanned; each candidate is checked against the contacts
+        postings = [self.grams.get(gram) for gram in trigrams(query)]
+        if not postings or not all(postings):
+            return
+        for entry_id in min(postings, key=len):
+            if len(found) >= limit:
+                break
+            key = self.keys[entry_id]
+            if key is None or key in found:
+                continue
+            if any(query in value for _, value in self._field_values(self.contacts[key])):
+                found[key] = None
+
+    def _fuzzy(self, query: str, limit: int, found: dict) -> None:
+        candidates = set()
+        for variant in deletes(query):
+            words = self.variants.get(variant, ())
+            if isinstance(words, str):
+                candidates.add(words)
+            else:
+                candidates.update(words)
+
+        for word in sorted(candidates):
+            if edit_distance(query, word) > 1:
+                continue
+            for entry_id in self.words[word]:
+                if len(found) >= limit:
+                    return
+                key = self.keys[entry_id]
+                if key is not None:
+                    found.setdefault(key, None)
+
+    def search(self, query: str, limit: int = 10, fuzzy: bool = True) -> list:
+        """
+        Find contacts whose name, phone or email match a query.
+
+        Prefix matches come first, then substring matches, then (if enabled)
+        fuzzy matches, until the limit is reached.
+
+        Args:
+            query (str): The text to search for
+            limit (int): Maximum number of keys to return
+            fuzzy (bool): Whether to include typo-tolerant matches
+
+        Returns:
+            list: Keys of matching contacts, best matches first
+        """
+        query = query.strip().lower()
+        if not query or limit <= 0:
+            return []
+
+        # dict keeps insertion order, so it doubles as an ordered set
+        found = {}
+        self._prefix(query, limit, found)
+        if len(query) >= 3 and len(found) < limit:
+            self._substring(query, limit, found)
+        if fuzzy and len(query) >= FUZZY_MIN_LENGTH and query.isalpha() and len(found) < limit:
+            self._fuzzy(query, limit, found)
+        return list(found)
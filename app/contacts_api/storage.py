@@ -0,0 +1,436 @@
+"""
+Storage Module for Contacts API
+
+The Contacts API serves every read from its in-memory dictionary. This module
+makes that dictionary durable. All stores share the same methods, so the API
+does not need to know which one is in use.
+
+MemoryStore keeps nothing on disk (the original behaviour).
+
+WalStore appends every create, update and delete to a write-ahead log (one JSON
+line per change) before the dictionary is changed. Every few thousand changes
+the log is moved aside and a new one is started, and a background thread writes
+a copy of the dictionary taken at that moment to a snapshot file (one JSON line
+per contact), then deletes the old log. Requests only wait for the copy, and
+startup only has to load one snapshot and replay a short log.
+
+Stores load contacts into a mapping supplied by the caller, so a compact mapping
+can be filled directly without first building a full dictionary.
+
+SqliteStore keeps contacts in a SQLite database and records every change in a
+numbered change feed. Each uvicorn worker keeps its own dictionary and, before
+handling a request, applies the changes other workers made since it last looked.
+All workers therefore serve the same dataset.
+
+Classes:
+    MemoryStore: No persistence
+    WalStore: Snapshot plus write-ahead log
+    SqliteStore: Shared SQLite database with a change feed
+
+Functions:
+    store_contact(contacts, key, contact): Put a loaded contact into a mapping, skipping bad records
+    open_store(kind): Create the store selected by CONTACTS_STORAGE
+"""
+
+from contextlib import contextmanager
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from service_metrics import record_io, tracked_open
+from service_storage import claim_exclusive
+
+# Data files are kept next to this module unless their environment variable is set
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def store_contact(contacts, key: str, contact) -> bool:
+    """
+    Put a contact read from storage into the contacts mapping.
+
+    A record the mapping cannot hold (for example text CompactContacts cannot
+    encode, such as a lone surrogate, or a missing field) is reported and
+    skipped, so one bad record cannot stop the API from starting.
+
+    Args:
+        contacts: Mapping of name -> contact record
+        key (str): The contact's key
+        contact: The contact record
+
+    Returns:
+        bool: True if the contact was stored
+    """
+    try:
+        contacts[key] = contact
+        return True
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        print(f"Skipping contact {key!r} that cannot be loaded: {e}")
+        return False
+
+class MemoryStore:
+    """Keeps contacts in memory only; everything is lost on restart."""
+
+    def load(self, contacts):
+        """
+        Load all contacts.
+
+        Args:
+            contacts: Empty mapping to fill with name -> contact record
+
+        Returns:
+            The filled mapping
+        """
+        self.contacts = contacts
+        return contacts
+
+    def put(self, key: str, contact: dict) -> None:
+        """
+        Record that a contact was created or updated.
+
+        Args:
+            key (str): The contact's key
+            contact (dict): The contact record
+        """
+
+    def delete(self, key: str) -> None:
+        """
+        Record that a contact was deleted.
+
+        Args:
+            key (str): The contact's key
+        """
+
+    def changes(self):
+        """
+        Return changes made by other processes since the last call.
+
+        Returns:
+            list | None: (op, key, contact) tuples, or None if the caller must
+                reload everything with load()
+        """
+        return []
+
+class WalStore(MemoryStore):
+    """
+    Durable store made of a snapshot file and a write-ahead log.
+
+    Only one process may use a log at a time; load() refuses to open a log that
+    another process holds. The contacts mapping must provide copy(), as dict
+    and CompactContacts do.
+
+    Attributes:
+        snapshot_file (str): Path of the JSON lines snapshot
+        wal_file (str): Path of the write-ahead log
+        old_wal_file (str): Path of the log being folded into the next snapshot
+        snapshot_every (int): Number of logged changes that triggers a snapshot
+        fsync (bool): Whether to fsync the log after every change
+    """
+
+    def __init__(self, snapshot_file: str, wal_file: str, snapshot_every: int = 10000, fsync: bool = True):
+        self.snapshot_file = snapshot_file
+        self.wal_file = wal_file
+        self.old_wal_file = f"{wal_file}.old"
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.contacts = {}
+        self._logged = 0
+        self._wal = None
+        # Thread writing a snapshot, or None
+        self._snapshotting = None
+        self._lock = threading.Lock()
+
+    def load(self, contacts):
+        """
+        Load the snapshot and replay the write-ahead log on top of it.
+
+        A partly written last line (from a crash mid-append) is cut off the log
+        so new changes are appended after the last complete one. An old log
+        left by an interrupted snapshot is replayed first and then folded into
+        a new snapshot.
+
+        Args:
+            contacts: Empty mapping to fill with name -> contact record
+
+        Returns:
+            The filled mapping
+
+        Raises:
+            DataInUseError: If another process already uses the log
+        """
+        claim_exclusive(
+            f"{self.wal_file}.lock",
+            "The write-ahead log can only be used by one process; "
+            "set CONTACTS_STORAGE=sqlite to run several workers."
+        )
+        if os.path.exists(self.snapshot_file):
+            with tracked_open(self.snapshot_file, "r") as f:
+                for line in f:
+                    key, contact = json.loads(line)
+                    store_contact(contacts, key, contact)
+
+        if os.path.exists(self.old_wal_file):
+            self._replay(self.old_wal_file, contacts)
+        logged = 0
+        if os.path.exists(self.wal_file):
+            logged, valid_bytes = self._replay(self.wal_file, contacts)
+            if valid_bytes < os.path.getsize(self.wal_file):
+                os.truncate(self.wal_file, valid_bytes)
+
+        self.contacts = contacts
+        self._logged = logged
+        self._wal = open(self.wal_file, "a")
+        if os.path.exists(self.old_wal_file):
+            self.snapshot()
+        return contacts
+
+    def _replay(self, path: str, contacts) -> tuple:
+        """Apply the complete lines of a log file; return (changes applied, bytes read)."""
+        logged = 0
+        valid_bytes = 0
+        with tracked_open(path, "rb", label=os.path.basename(self.wal_file)) as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if entry["op"] == "put":
+                    store_contact(contacts, entry["key"], entry["contact"])
+                else:
+                    contacts.pop(entry["key"], None)
+                valid_bytes += len(line)
+                logged += 1
+        return logged, valid_bytes
+
+    def _append(self, entry: dict) -> None:
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            # Roll over before logging: every change logged so far is already in
+            # the dictionary, but this one is not applied until we return
+            if self._logged >= self.snapshot_every and self._snapshotting is None:
+                data = self._roll()
+                self._snapshotting = threading.Thread(
+                    target=self._write_snapshot, args=(data,), name="contacts-snapshot", daemon=True
+                )
+                self._snapshotting.start()
+            start = time.perf_counter()
+            self._wal.write(line)
+            self._wal.flush()
+            if self.fsync:
+                os.fsync(self._wal.fileno())
+            self._logged += 1
+        record_io("write", os.path.basename(self.wal_file), len(line), time.perf_counter() - start)
+
+    def put(self, key: str, contact: dict) -> None:
+        """
+        Log that a contact was created or updated.
+
+        Args:
+            key (str): The contact's key
+            contact (dict): The contact record
+        """
+        self._append({"op": "put", "key": key, "contact": contact})
+
+    def delete(self, key: str) -> None:
+        """
+        Log that a contact was deleted.
+
+        Args:
+            key (str): The contact's key
+        """
+        self._append({"op": "delete", "key": key})
+
+    def _roll(self):
+        """
+        Move the log aside and start a new one. The caller holds the lock.
+
+        Returns:
+            A copy of the contacts, covering every change in the old log
+        """
+        data = self.contacts.copy()
+        self._wal.close()
+        if os.path.exists(self.old_wal_file):
+            # The last snapshot failed and still needs the old log; keep both together
+            with open(self.wal_file, "rb") as src, open(self.old_wal_file, "ab") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(self.wal_file)
+        else:
+            os.replace(self.wal_file, self.old_wal_file)
+        self._wal = open(self.wal_file, "a")
+        self._logged = 0
+        return data
+
+    def _write_snapshot(self, data) -> None:
+        """Write a copy of the contacts to the snapshot file, then delete the old log."""
+        try:
+            tmp_file = f"{self.snapshot_file}.tmp"
+            with tracked_open(tmp_file, "w", label=os.path.basename(self.snapshot_file)) as f:
+                for key, contact in data.items():
+                    f.write(json.dumps([key, contact]) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.snapshot_file)
+            os.remove(self.old_wal_file)
+        finally:
+            with self._lock:
+                self._snapshotting = None
+
+    def snapshot(self) -> None:
+        """
+        Write all contacts to the snapshot file and empty the log, waiting for it.
+
+        The log is moved aside, the snapshot is written to a temporary file and
+        moved into place, and only then is the old log deleted. A crash in
+        between only means some changes are replayed twice, which gives the
+        same result.
+        """
+        while True:
+            with self._lock:
+                running = self._snapshotting
+                if running is None:
+                    data = self._roll()
+                    self._snapshotting = threading.current_thread()
+                    break
+            running.join()
+        self._write_snapshot(data)
+
+class SqliteStore(MemoryStore):
+    """
+    Contacts shared by several processes through a SQLite database.
+
+    Attributes:
+        db_file (str): Path of the database
+        keep_changes (int): Number of recent changes kept in the change feed
+    """
+
+    def __init__(self, db_file: str, keep_changes: int = 10000):
+        self.db_file = db_file
+        self.keep_changes = keep_changes
+        self.last_seq = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute("CREATE TABLE IF NOT EXISTS contacts (key TEXT PRIMARY KEY, contact TEXT NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS changes ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, op TEXT NOT NULL, key TEXT NOT NULL, contact TEXT)"
+        )
+
+    @contextmanager
+    def _transaction(self, mode: str = "DEFERRED"):
+        """
+        Run the statements of the with block in one transaction.
+
+        If any of them (or the commit) fails, the transaction is rolled back, so
+        the connection does not stay inside it holding the database lock.
+
+        Args:
+            mode (str): DEFERRED, or IMMEDIATE to take the write lock at once
+        """
+        self._db.execute(f"BEGIN {mode}")
+        try:
+            yield
+            self._db.execute("COMMIT")
+        except BaseException:
+            if self._db.in_transaction:
+                self._db.execute("ROLLBACK")
+            raise
+
+    def load(self, contacts):
+        """
+        Load all contacts from the database.
+
+        Args:
+            contacts: Empty mapping to fill with name -> contact record
+
+        Returns:
+            The filled mapping
+        """
+        with self._lock, self._transaction():
+            self.last_seq = self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+            for key, contact in self._db.execute("SELECT key, contact FROM contacts"):
+                store_contact(contacts, key, json.loads(contact))
+        return contacts
+
+    def _write(self, op: str, key: str, contact) -> None:
+        data = json.dumps(contact) if contact is not None else None
+        with self._lock:
+            with self._transaction("IMMEDIATE"):
+                if op == "put":
+                    self._db.execute("INSERT OR REPLACE INTO contacts (key, contact) VALUES (?, ?)", (key, data))
+                else:
+                    self._db.execute("DELETE FROM contacts WHERE key = ?", (key,))
+                seq = self._db.execute(
+                    "INSERT INTO changes (op, key, contact) VALUES (?, ?, ?)", (op, key, data)
+                ).lastrowid
+                if seq % 1000 == 0:
+                    self._db.execute("DELETE FROM changes WHERE seq <= ?", (seq - self.keep_changes,))
+            # Skip our own change in changes() unless others wrote in between
+            if seq == self.last_seq + 1:
+                self.last_seq = seq
+
+    def put(self, key: str, contact: dict) -> None:
+        """
+        Save a created or updated contact.
+
+        Args:
+            key (str): The contact's key
+            contact (dict): The contact record
+        """
+        self._write("put", key, contact)
+
+    def delete(self, key: str) -> None:
+        """
+        Delete a contact from the database.
+
+        Args:
+            key (str): The contact's key
+        """
+        self._write("delete", key, None)
+
+    def changes(self):
+        """
+        Return changes made by other workers since the last call.
+
+        Returns:
+            list | None: (op, key, contact) tuples in order, or None if this
+                worker fell so far behind that the changes were pruned and it
+                must reload everything with load()
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, op, key, contact FROM changes WHERE seq > ? ORDER BY seq", (self.last_seq,)
+            ).fetchall()
+            if not rows:
+                return []
+            if rows[0][0] != self.last_seq + 1:
+                return None
+            self.last_seq = rows[-1][0]
+        return [
+            (op, key, json.loads(contact) if contact is not None else None)
+            for _, op, key, contact in rows
+        ]
+
+def open_store(kind: str):
+    """
+    Create the store selected by CONTACTS_STORAGE.
+
+    Args:
+        kind (str): "wal" (default), "sqlite" or "memory"
+
+    Returns:
+        MemoryStore | WalStore | SqliteStore: The store
+    """
+    if kind == "memory":
+        return MemoryStore()
+    if kind == "sqlite":
+        return SqliteStore(os.environ.get("CONTACTS_DB_FILE", os.path.join(SERVICE_DIR, "contacts.db")))
+    return WalStore(
+        os.environ.get("CONTACTS_SNAPSHOT_FILE", os.path.join(SERVICE_DIR, "contacts_snapshot.jsonl")),
+        os.environ.get("CONTACTS_WAL_FILE", os.path.join(SERVICE_DIR, "contacts.wal")),
+        snapshot_every=int(os.environ.get("CONTACTS_SNAPSHOT_EVERY", "10000")),
+        fsync=os.environ.get("CONTACTS_WAL_FSYNC", "1") == "1"
+    )
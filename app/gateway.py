@@ -0,0 +1,171 @@
+"""
+API Gateway
+
+A single ASGI application that serves all five APIs from one process, each under
+its own path prefix. Running them together means one Python interpreter, one
+copy of FastAPI and one uvicorn deployment instead of five, and the APIs share
+the file cache (see service_storage), the metrics (see service_metrics) and one
+pool of worker threads.
+
+Each API is imported the first time one of its endpoints is requested, so the
+gateway starts immediately and an API that is never called costs nothing.
+
+Every API keeps its flat "from storage import ..." style imports. Because both
+the Notes and Contacts APIs have a search_index module, each API's modules are
+loaded as "<directory>.<module>" with their own __import__ that resolves those
+flat names within the API's directory, so every API gets its own copies.
+
+Data files default to each API's own directory, whatever the working directory
+is, and can be moved with the environment variables listed in the README.
+
+The gateway must run as a single process (uvicorn's default of one worker).
+The Notes API keeps its search index and content store manifest in memory, and
+the Contacts API's default write-ahead log is owned by one process, so a second
+worker would silently overwrite the first one's data. The gateway therefore
+locks the notes directory at startup and a second worker on the same data fails
+to start. To spread contacts over several workers, run the Contacts API on its
+own with CONTACTS_STORAGE=sqlite.
+
+Settings (environment variables):
+    GATEWAY_WORKER_THREADS: Threads shared by all blocking handlers and file I/O (default 40)
+
+Endpoints:
+    /job-tracker/... - Job Application Tracker API
+    /notes/... - Notes API
+    /contacts/... - Contacts API
+    /shopping-cart/... - Shopping Cart API
+    /students/... - Student Management API
+    GET /metrics - Metrics of every API (Prometheus format)
+
+Usage:
+    cd app
+    uvicorn gateway:app
+"""
+
+import builtins
+from contextlib import asynccontextmanager
+import importlib.util
+import os
+import sys
+import threading
+import anyio.to_thread
+from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(APP_DIR)
+from service_metrics.middleware import metrics
+from service_storage import claim_exclusive
+
+# Path prefix -> directory of the API served under it
+SERVICES = {
+    "/job-tracker": "job_tracker_api",
+    "/notes": "notes_api",
+    "/contacts": "contacts_api",
+    "/shopping-cart": "shopping_cart_api",
+    "/students": "student_api",
+}
+
+GATEWAY_WORKER_THREADS = int(os.environ.get("GATEWAY_WORKER_THREADS", "40"))
+
+# Same default as notes_api/main.py, which claims the same lock when it is imported
+NOTES_DIR = os.environ.get("NOTES_DIR", os.path.join(APP_DIR, "notes_api", "notes"))
+
+# The Notes API runs its file I/O on FastAPI's threadpool instead of its own
+# executor, so every API uses the one pool sized by GATEWAY_WORKER_THREADS
+os.environ.setdefault("NOTES_IO_MODE", "threadpool")
+
+def load_service(directory: str):
+    """
+    Import an API's main module and return its FastAPI application.
+
+    The API's modules are loaded as "<directory>.<module>" and run with their
+    own __import__, which resolves the API's flat imports to those modules.
+    Nothing goes through the plain module names in sys.modules, so several APIs
+    can be imported at the same time without seeing each other's modules.
+
+    Args:
+        directory (str): Directory of the API inside app/
+
+    Returns:
+        FastAPI: The API's application
+    """
+    service_dir = os.path.join(APP_DIR, directory)
+    local_modules = {name[:-3] for name in os.listdir(service_dir) if name.endswith(".py")}
+
+    def service_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if level == 0 and name in local_modules:
+            return load_module(name)
+        return builtins.__import__(name, globals, locals, fromlist, level)
+
+    service_builtins = dict(vars(builtins), __import__=service_import)
+
+    def load_module(name: str):
+        qualified = f"{directory}.{name}"
+        module = sys.modules.get(qualified)
+        if module is None:
+            spec = importlib.util.spec_from_file_location(qualified, os.path.join(service_dir, f"{name}.py"))
+            module = importlib.util.module_from_spec(spec)
+            # Import statements run by the module look up __import__ here
+            module.__builtins__ = service_builtins
+            sys.modules[qualified] = module
+            try:
+                spec.loader.exec_module(module)
+            except BaseException:
+                del sys.modules[qualified]
+                raise
+        return module
+
+    return load_module("main").app
+
+class LazyService:
+    """
+    ASGI application that imports an API on its first request.
+
+    The import runs on a worker thread, so a slow start (for example loading a
+    large contacts snapshot) does not hold up requests to the other APIs.
+
+    Attributes:
+        directory (str): Directory of the API inside app/
+        app (FastAPI | None): The API's application once imported
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.app = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self.app is None:
+                self.app = load_service(self.directory)
+        return self.app
+
+    async def __call__(self, scope, receive, send):
+        app = self.app
+        if app is None:
+            app = await run_in_threadpool(self._load)
+        await app(scope, receive, send)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Refuse to start next to another process serving the same notes, before any request
+    os.makedirs(NOTES_DIR, exist_ok=True)
+    claim_exclusive(
+        os.path.join(NOTES_DIR, ".lock"),
+        "Run the gateway as a single process (without --workers)."
+    )
+    # Size the threadpool used by sync endpoints and by the Notes API's file I/O
+    anyio.to_thread.current_default_thread_limiter().total_tokens = GATEWAY_WORKER_THREADS
+    yield
+
+app = FastAPI(
+    title="API Gateway",
+    description="All APIs served from one process",
+    version="1.0.0",
+    lifespan=lifespan
+)
+app.add_api_route("/metrics", metrics, methods=["GET"], include_in_schema=False)
+
+for prefix, directory in SERVICES.items():
+    app.mount(prefix, LazyService(directory))
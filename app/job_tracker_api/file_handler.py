@@ -3,13 +3,16 @@ File Handler Module for Job Application Tracker
 
 This module provides functions for reading and writing job application data to JSON files.
 It handles basic file operations with error handling for better reliability.
+Files are accessed through the shared storage layer (see service_storage), so unchanged
+files are served from the shared cache and reads and writes are counted in the metrics.
 
 Functions:
     save_to_json(data, filename): Saves data to a JSON file
     load_from_json(filename): Loads data from a JSON file
+    read_from_json(filename): Loads data from a JSON file, cached and read-only
 """
 
-import json
+from service_storage import load_json, read_json, save_json
 
 def save_to_json(data, filename):
     """
@@ -23,14 +26,13 @@ def save_to_json(data, filename):
         Exception: If there's an error writing to the file
     """
     try:
-        with open(filename, 'w') as file:
-            json.dump(data, file, indent=4)
+        save_json(data, filename)
     except Exception as e:
         print(f"Error saving to file: {str(e)}")
 
 def load_from_json(filename):
     """
-    Load data from a JSON file.
+    Load data from a JSON file into a list the caller may modify.
 
     Args:
         filename (str): Name of the file to load from
@@ -42,8 +44,27 @@ def load_from_json(filename):
         Exception: If there's an error reading the file
     """
     try:
-        with open(filename, 'r') as file:
-            return json.load(file)
+        return load_json(filename)
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        print(f"Error loading from file: {str(e)}")
+        return []
+
+def read_from_json(filename):
+    """
+    Load data from a JSON file for reading only.
+
+    The list is shared with other requests through the cache and must not be modified.
+
+    Args:
+        filename (str): Name of the file to load from
+
+    Returns:
+        list: List of data from the JSON file, or empty list if file doesn't exist
+    """
+    try:
+        return read_json(filename)
     except FileNotFoundError:
         return []
     except Exception as e:
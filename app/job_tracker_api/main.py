@@ -8,19 +8,30 @@ Endpoints:
     POST /applications/ - Create a new job application
     GET /applications/ - List all applications
     GET /applications/search - Search applications by status
+    GET /metrics - Request latency and file I/O metrics (Prometheus format)
 """
 
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from file_handler import save_to_json, load_from_json
+import os
+import sys
+
+# The shared service_metrics and service_storage packages live next to this service's directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from service_metrics import install_metrics
+from file_handler import save_to_json, load_from_json, read_from_json
 
 app = FastAPI(
     title="Job Application Tracker",
     description="API for tracking job applications",
     version="1.0.0"
 )
+install_metrics(app, "job_tracker")
 
-APPLICATIONS_FILE = "applications.json"
+# Stored next to this module unless APPLICATIONS_FILE points elsewhere
+APPLICATIONS_FILE = os.environ.get(
+    "APPLICATIONS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "applications.json")
+)
 
 class JobApplication(BaseModel):
     """
@@ -87,7 +98,7 @@ def get_applications():
             }
         ]
     """
-    return load_from_json(APPLICATIONS_FILE)
+    return read_from_json(APPLICATIONS_FILE)
 
 @app.get("/applications/search")
 def search_applications(status: str):
@@ -103,7 +114,7 @@ def search_applications(status: str):
     Example:
         GET /applications/search?status=pending
     """
-    applications = load_from_json(APPLICATIONS_FILE)
+    applications = read_from_json(APPLICATIONS_FILE)
     matching_applications = []
     for app in applications:
         if app["status"].lower() == status.lower():
@@ -0,0 +1,68 @@
+"""
+File I/O Module for Notes API
+
+This module runs the blocking file operations of the Notes API off the event loop
+so the request handlers can be async.
+
+By default the work goes to a dedicated thread pool that is sized independently
+of FastAPI's shared threadpool. Setting NOTES_IO_MODE=threadpool sends it to the
+shared pool instead, which is how the old sync handlers were executed.
+
+To protect the server under load, the number of file operations that may be
+running or queued at once is capped. Requests beyond the cap fail fast with
+IOBusyError instead of piling up in the queue.
+
+Settings (environment variables):
+    NOTES_IO_MODE: "executor" (default) or "threadpool"
+    NOTES_IO_WORKERS: Number of threads in the dedicated pool (default 32)
+    NOTES_IO_MAX_PENDING: Maximum running plus queued operations (default 1024)
+
+Functions:
+    run_io(func, *args): Run a blocking function off the event loop
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import os
+
+from fastapi.concurrency import run_in_threadpool
+
+IO_MODE = os.environ.get("NOTES_IO_MODE", "executor")
+IO_WORKERS = int(os.environ.get("NOTES_IO_WORKERS", "32"))
+IO_MAX_PENDING = int(os.environ.get("NOTES_IO_MAX_PENDING", "1024"))
+
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="notes-io")
+
+# Operations currently running or waiting for a thread
+_pending = 0
+
+class IOBusyError(Exception):
+    """Raised when too many file operations are already running or queued."""
+
+async def run_io(func, *args):
+    """
+    Run a blocking function off the event loop.
+
+    Args:
+        func: The blocking function to call
+        *args: Positional arguments for the function
+
+    Returns:
+        The return value of the function
+
+    Raises:
+        IOBusyError: If NOTES_IO_MAX_PENDING operations are already in flight
+    """
+    global _pending
+    if _pending >= IO_MAX_PENDING:
+        raise IOBusyError("Too many file operations in progress")
+
+    _pending += 1
+    try:
+        if IO_MODE == "threadpool":
+            return await run_in_threadpool(func, *args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(io_executor, partial(func, *args))
+    finally:
+        _pending -= 1
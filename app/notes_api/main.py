@@ -3,28 +3,96 @@ Notes API
 
 A FastAPI application for managing notes using the file system. Each note is stored
 as a separate text file, allowing for basic CRUD operations (Create, Read, Update, Delete).
+Set NOTES_STORAGE=cas to store notes content-addressed instead, so identical bodies
+are kept once and large bodies are compressed (see note_store.py).
 
 Endpoints:
+    GET /notes/search?q= - Full-text search over note contents
+    GET /notes/cache/stats - Note content cache statistics
     POST /notes/{title} - Create a new note
     GET /notes/{title} - Read a note
     PUT /notes/{title} - Update a note
     DELETE /notes/{title} - Delete a note
+    PUT /notes/{title}/raw - Upload a note as a raw (optionally chunked) body
+    GET /notes/{title}/raw - Download a note as a file, with Range support
+    GET /metrics - Request latency and file I/O metrics (Prometheus format)
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
+import codecs
 import os
+import sys
+import tempfile
+import threading
+
+# The shared service_metrics and service_storage packages live next to this service's directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from service_metrics import install_metrics
+from service_storage import claim_exclusive, shared_cache
+from search_index import NoteIndex
+from file_io import IOBusyError, run_io
+from note_store import FileStore, ContentStore
 
 app = FastAPI(
     title="Notes API",
     description="Simple note-taking API using file system storage",
     version="1.0.0"
 )
+install_metrics(app, "notes")
 
-# Create notes directory if it doesn't exist
-NOTES_DIR = "notes"
+# Create notes directory if it doesn't exist (next to this module unless NOTES_DIR is set)
+NOTES_DIR = os.environ.get("NOTES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "notes"))
 os.makedirs(NOTES_DIR, exist_ok=True)
 
+# The search index and the content store manifest live in this process's memory,
+# so a second worker on the same notes would overwrite this one's changes
+claim_exclusive(
+    os.path.join(NOTES_DIR, ".lock"),
+    "The Notes API keeps its search index in memory and must run as a single process."
+)
+
+# "files" keeps one <title>.txt per note, "cas" deduplicates and compresses bodies
+NOTES_STORAGE = os.environ.get("NOTES_STORAGE", "files")
+NOTES_COMPRESS_MIN_BYTES = int(os.environ.get("NOTES_COMPRESS_MIN_BYTES", "4096"))
+if NOTES_STORAGE == "cas":
+    note_store = ContentStore(NOTES_DIR, compress_min_bytes=NOTES_COMPRESS_MIN_BYTES)
+else:
+    note_store = FileStore(NOTES_DIR)
+
+# Inverted index over note contents, kept in sync by the write endpoints
+INDEX_FILE = os.path.join(NOTES_DIR, ".search_index.json")
+INDEX_SAVE_DELAY = 1.0
+search_index = NoteIndex(note_store, INDEX_FILE, save_delay=INDEX_SAVE_DELAY)
+search_index.load()
+
+# In-memory LRU cache of note contents, shared with the other APIs' files and
+# bounded by FILE_CACHE_MAX_BYTES
+note_cache = shared_cache
+
+# A note's write and its index update happen under one of these locks (picked by
+# title), so concurrent writes to a note cannot leave the index on the older one
+NOTE_LOCKS = [threading.Lock() for _ in range(64)]
+
+def note_lock(title: str) -> threading.Lock:
+    """Return the lock serialising changes to a note."""
+    return NOTE_LOCKS[hash(title) % len(NOTE_LOCKS)]
+
+@app.exception_handler(IOBusyError)
+async def io_busy_handler(request: Request, exc: IOBusyError):
+    """
+    Tell clients to back off when the file I/O queue is full.
+
+    Returns:
+        JSONResponse: 503 response with a Retry-After header
+    """
+    return JSONResponse(
+        status_code=503,
+        content={"message": "Server busy, please retry"},
+        headers={"Retry-After": "1"}
+    )
+
 class Note(BaseModel):
     """
     Represents a note's content.
@@ -34,20 +102,90 @@ class Note(BaseModel):
     """
     content: str
 
-def get_note_path(title: str) -> str:
+def get_note_path(title: str):
     """
-    Generate the full file path for a note.
+    Get the path of the file holding a note's content.
 
     Args:
         title (str): The title of the note
 
     Returns:
-        str: Full path to the note file
+        str | None: Full path to the note file, or None if the content-addressed
+            store has no such note
+    """
+    return note_store.path(title)
+
+def load_note(title: str) -> str:
+    """
+    Return a note's content from the cache, reading and caching it on a miss.
+
+    Even a cache hit checks the file with os.stat, so this is run off the event loop.
+
+    Args:
+        title (str): The title of the note
+
+    Returns:
+        str: The note's content
+
+    Raises:
+        FileNotFoundError: If the note does not exist
     """
-    return os.path.join(NOTES_DIR, f"{title}.txt")
+    file_path = get_note_path(title)
+    content = note_cache.get(file_path) if file_path else None
+    if content is None:
+        content, file_path, stat = note_store.read(title)
+        note_cache.put(file_path, content, stat)
+    return content
+
+def save_note(title: str, content: str, create: bool = True) -> None:
+    """
+    Write a note, then drop its cached copy and re-index it.
+
+    Args:
+        title (str): The title of the note
+        content (str): Text to write
+        create (bool): Whether to create the note if it does not exist
+
+    Raises:
+        FileNotFoundError: If create is False and the note does not exist
+    """
+    with note_lock(title):
+        version = note_store.write(title, content, create)
+        note_cache.invalidate(get_note_path(title))
+        search_index.add(title, content, version=version)
+
+def save_note_file(title: str, tmp_path: str) -> None:
+    """
+    Store an uploaded file as a note, then drop its cached copy and re-index it.
+
+    Args:
+        title (str): The title of the note
+        tmp_path (str): Temporary file in the notes directory; it is moved
+            or removed by this call
+    """
+    with note_lock(title):
+        version = note_store.write_file(title, tmp_path)
+        note_cache.invalidate(get_note_path(title))
+        search_index.add_file(title, version=version)
+
+def delete_note_file(title: str) -> None:
+    """
+    Delete a note, its cached copy and its index entry.
+
+    Args:
+        title (str): The title of the note
+
+    Raises:
+        FileNotFoundError: If the note does not exist
+    """
+    with note_lock(title):
+        file_path = get_note_path(title)
+        note_store.remove(title)
+        note_cache.invalidate(file_path)
+        search_index.remove(title)
 
 @app.post("/notes/{title}")
-def create_note(title: str, note: Note):
+async def create_note(title: str, note: Note):
     """
     Create a new note with the given title and content.
 
@@ -63,15 +201,48 @@ def create_note(title: str, note: Note):
         Body: {"content": "This is my first note"}
     """
     try:
-        file_path = get_note_path(title)
-        with open(file_path, "w") as f:
-            f.write(note.content)
+        await run_io(save_note, title, note.content)
         return {"message": f"Note '{title}' created successfully!"}
+    except IOBusyError:
+        raise
     except:
         return {"message": "Error creating note"}
 
+@app.get("/notes/search")
+def search_notes(q: str, limit: int = Query(10, ge=1)):
+    """
+    Search note contents, best matches first.
+
+    Words are matched case-insensitively and ranked with BM25. Wrap words in
+    double quotes to search for an exact phrase.
+
+    Args:
+        q (str): The search query
+        limit (int): Maximum number of results to return (at least 1)
+
+    Returns:
+        dict: The query and a list of matching note titles with their scores
+
+    Example:
+        GET /notes/search?q=senior "code review"
+    """
+    return {"query": q, "results": search_index.search(q, limit)}
+
+@app.get("/notes/cache/stats")
+def get_cache_stats():
+    """
+    Report hit, miss and eviction counts of the file cache holding note contents.
+
+    Returns:
+        dict: Cache statistics
+
+    Example:
+        GET /notes/cache/stats
+    """
+    return note_cache.stats()
+
 @app.get("/notes/{title}")
-def read_note(title: str):
+async def read_note(title: str):
     """
     Read a note's content.
 
@@ -85,17 +256,18 @@ def read_note(title: str):
         GET /notes/my-first-note
     """
     try:
-        file_path = get_note_path(title)
-        if not os.path.exists(file_path):
+        try:
+            content = await run_io(load_note, title)
+        except FileNotFoundError:
             return {"message": f"Note '{title}' not found"}
-        with open(file_path, "r") as f:
-            content = f.read()
         return {"title": title, "content": content}
+    except IOBusyError:
+        raise
     except:
         return {"message": "Error reading note"}
 
 @app.put("/notes/{title}")
-def update_note(title: str, note: Note):
+async def update_note(title: str, note: Note):
     """
     Update an existing note's content.
 
@@ -111,17 +283,18 @@ def update_note(title: str, note: Note):
         Body: {"content": "Updated content"}
     """
     try:
-        file_path = get_note_path(title)
-        if not os.path.exists(file_path):
+        try:
+            await run_io(save_note, title, note.content, False)
+        except FileNotFoundError:
             return {"message": f"Note '{title}' not found"}
-        with open(file_path, "w") as f:
-            f.write(note.content)
         return {"message": f"Note '{title}' updated successfully!"}
+    except IOBusyError:
+        raise
     except:
         return {"message": "Error updating note"}
 
 @app.delete("/notes/{title}")
-def delete_note(title: str):
+async def delete_note(title: str):
     """
     Delete a note.
 
@@ -135,10 +308,94 @@ def delete_note(title: str):
         DELETE /notes/my-first-note
     """
     try:
-        file_path = get_note_path(title)
-        if not os.path.exists(file_path):
+        try:
+            await run_io(delete_note_file, title)
+        except FileNotFoundError:
             return {"message": f"Note '{title}' not found"}
-        os.remove(file_path)
         return {"message": f"Note '{title}' deleted successfully!"}
+    except IOBusyError:
+        raise
     except:
         return {"message": "Error deleting note"}
+
+@app.put("/notes/{title}/raw")
+async def upload_note(title: str, request: Request):
+    """
+    Create or replace a note from the raw request body.
+
+    The body is written to disk chunk by chunk as it arrives, so large notes
+    such as logs or transcripts are never held in memory as a whole. Both
+    Content-Length and chunked transfer encoding are accepted.
+
+    Args:
+        title (str): The title of the note
+        request (Request): The incoming request carrying the note text
+
+    Returns:
+        dict: Success/error message and the number of bytes written
+
+    Raises:
+        HTTPException: If the body is not UTF-8 text
+
+    Example:
+        PUT /notes/server-log/raw
+        Body: <raw text>
+    """
+    # Write to a temporary file first so readers never see a partial note
+    fd, tmp_path = tempfile.mkstemp(dir=NOTES_DIR, suffix=".part")
+    # Check the text as it arrives, so a binary body is rejected before it replaces the note
+    decoder = codecs.getincrementaldecoder("utf-8")()
+
+    def write_chunk(f, chunk: bytes, final: bool = False):
+        decoder.decode(chunk, final)
+        f.write(chunk)
+
+    try:
+        size = 0
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in request.stream():
+                await run_io(write_chunk, f, chunk)
+                size += len(chunk)
+            write_chunk(f, b"", final=True)
+        await run_io(save_note_file, title, tmp_path)
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        if isinstance(e, IOBusyError):
+            raise
+        if isinstance(e, UnicodeDecodeError):
+            raise HTTPException(status_code=400, detail="Note body must be UTF-8 text")
+        return {"message": "Error uploading note"}
+
+    return {"message": f"Note '{title}' uploaded successfully!", "bytes": size}
+
+@app.get("/notes/{title}/raw")
+def download_note(title: str):
+    """
+    Download a note's content as a plain text file.
+
+    The file is streamed straight from disk (using sendfile when the server
+    supports it) and honours HTTP Range headers for partial reads. Notes kept
+    compressed by the content-addressed store are decompressed while streaming
+    and are always sent whole.
+
+    Args:
+        title (str): The title of the note to download
+
+    Returns:
+        FileResponse | StreamingResponse: The note content
+
+    Raises:
+        HTTPException: If the note is not found
+
+    Example:
+        GET /notes/server-log/raw
+        Range: bytes=0-1023
+    """
+    file_path = get_note_path(title)
+    if not file_path or not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail=f"Note '{title}' not found")
+    headers = {"Content-Disposition": f'attachment; filename="{title}.txt"'}
+    if note_store.is_compressed(title):
+        return StreamingResponse(note_store.iter_bytes(title), media_type="text/plain", headers=headers)
+    return FileResponse(file_path, media_type="text/plain", filename=f"{title}.txt")
@@ -0,0 +1,473 @@
+"""
+Note Storage Module for Notes API
+
+This module decides how note contents are laid out on disk. Two layouts are
+available and both expose the same methods, so the API handlers, the content
+cache and the search index do not need to know which one is in use.
+
+FileStore keeps the original layout: one "<title>.txt" file per note.
+
+ContentStore stores each distinct note body once, named by the SHA-256 hash of
+its content, and gzip-compresses bodies above a size threshold. A small JSON
+manifest maps every title to the hash of its body. Notes sharing a template or
+boilerplate body take up the space of a single copy, and a body is deleted once
+no title points at it any more. When a ContentStore is opened on a directory
+that still holds "<title>.txt" files, they are moved into the store; when a
+FileStore is opened on a directory holding a content-addressed store, its notes
+are written back out as "<title>.txt" files, so either layout can be switched
+back to without losing notes.
+
+Classes:
+    FileStore: One plain text file per note
+    ContentStore: Content-addressed, deduplicated and compressed note bodies
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from service_metrics import tracked_open
+
+# Size of the blocks used when hashing, copying or streaming note files
+CHUNK_SIZE = 64 * 1024
+
+# File label for note bodies in the I/O metrics, instead of one per title
+NOTE_LABEL = "note"
+
+class FileStore:
+    """
+    Stores each note as a plain "<title>.txt" file.
+
+    Attributes:
+        notes_dir (str): Directory holding the note files
+    """
+
+    def __init__(self, notes_dir: str):
+        self.notes_dir = notes_dir
+        # Move notes back out of a store left behind by NOTES_STORAGE=cas
+        if os.path.exists(os.path.join(notes_dir, ".manifest.json")):
+            ContentStore(notes_dir).export_text_files()
+
+    def path(self, title: str) -> str:
+        """
+        Generate the full file path for a note.
+
+        Args:
+            title (str): The title of the note
+
+        Returns:
+            str: Full path to the note file
+        """
+        return os.path.join(self.notes_dir, f"{title}.txt")
+
+    def titles(self) -> list:
+        """
+        List the titles of all stored notes.
+
+        Returns:
+            list: Note titles
+        """
+        return [
+            name[:-len(".txt")]
+            for name in os.listdir(self.notes_dir)
+            if name.endswith(".txt")
+        ]
+
+    def version(self, title: str) -> list:
+        """
+        Return a value that changes whenever the note's content changes.
+
+        Args:
+            title (str): The title of the note
+
+        Returns:
+            list: [mtime_ns, size] of the note file
+
+        Raises:
+            FileNotFoundError: If the note does not exist
+        """
+        stat = os.stat(self.path(title))
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def is_compressed(self, title: str) -> bool:
+        """Plain files are never compressed."""
+        return False
+
+    def read(self, title: str) -> tuple:
+        """
+        Read a note.
+
+        Args:
+            title (str): The title of the note
+
+        Returns:
+            tuple: (content, path, stat) of the file that was read
+
+        Raises:
+            FileNotFoundError: If the note does not exist
+        """
+        path = self.path(title)
+        with tracked_open(path, "r", label=NOTE_LABEL) as f:
+            stat = os.fstat(f.fileno())
+            return f.read(), path, stat
+
+    def open_text(self, title: str):
+        """
+        Open a note for reading line by line.
+
+        Args:
+            title (str): The title of the note
+
+        Returns:
+            file: A text file object
+        """
+        return tracked_open(self.path(title), "r", label=NOTE_LABEL)
+
+    def write(self, title: str, content: str, create: bool = True) -> list:
+        """
+        Write a note, replacing any existing content.
+
+        Args:
+            title (str): The title of the note
+            content (str): Text to write
+            create (bool): Whether to create the note if it does not exist
+
+        Returns:
+            list: Version of the written content, as returned by version()
+
+        Raises:
+            FileNotFoundError: If create is False and the note does not exist
+        """
+        with tracked_open(self.path(title), "w" if create else "r+", label=NOTE_LABEL) as f:
+            f.write(content)
+            f.truncate()
+            f.flush()
+            stat = os.fstat(f.fileno())
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def write_file(self, title: str, tmp_path: str) -> list:
+        """
+        Store an uploaded file as a note's content.
+
+        Args:
+            title (str): The title of the note
+            tmp_path (str): Temporary file in the notes directory; it is moved
+                or removed by this call
+
+        Returns:
+            list: Version of the stored content, as returned by version()
+        """
+        stat = os.stat(tmp_path)
+        os.replace(tmp_path, self.path(title))
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def remove(self, title: str) -> None:
+        """
+        Delete a note.
+
+        Args:
+            title (str): The title of the note
+
+        Raises:
+            FileNotFoundError: If the note does not exist
+        """
+        os.remove(self.path(title))
+
+class ContentStore:
+    """
+    Stores note bodies by content hash, once per distinct body.
+
+    Bodies live in "<notes_dir>/.objects/<hash[:2]>/<hash>" and the title to hash
+    mapping in "<notes_dir>/.manifest.json". Bodies of at least compress_min_bytes
+    bytes are stored gzip-compressed.
+
+    Attributes:
+        notes_dir (str): Directory holding the store
+        compress_min_bytes (int): Smallest body size that gets compressed
+        manifest (dict): title -> {"hash": str, "compressed": bool}
+        blobs (dict): hash -> [number of titles pointing at it, compressed]
+    """
+
+    def __init__(self, notes_dir: str, compress_min_bytes: int = 4096):
+        self.notes_dir = notes_dir
+        self.compress_min_bytes = compress_min_bytes
+        self.objects_dir = os.path.join(notes_dir, ".objects")
+        self.manifest_file = os.path.join(notes_dir, ".manifest.json")
+        self.manifest = {}
+        self.blobs = {}
+        self._lock = threading.RLock()
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        if os.path.exists(self.manifest_file):
+            with tracked_open(self.manifest_file, "r") as f:
+                self.manifest = json.load(f)
+        for entry in self.manifest.values():
+            blob = self.blobs.setdefault(entry["hash"], [0, entry["compressed"]])
+            blob[0] += 1
+        self._import_text_files()
+
+    def _import_text_files(self) -> None:
+        """Move notes left in the plain "<title>.txt" layout into the store."""
+        for name in os.listdir(self.notes_dir):
+            if not name.endswith(".txt"):
+                continue
+            path = os.path.join(self.notes_dir, name)
+            fd, tmp_path = tempfile.mkstemp(dir=self.notes_dir, suffix=".part")
+            os.close(fd)
+            shutil.copyfile(path, tmp_path)
+            self.write_file(name[:-len(".txt")], tmp_path)
+            os.remove(path)
+
+    def export_text_files(self) -> None:
+        """
+        Write every note back as a plain "<title>.txt" file and delete the store.
+
+        The manifest and bodies are only removed once all notes are written, so
+        an interrupted export is simply redone on the next start.
+        """
+        with self._lock:
+            for title in self.manifest:
+                fd, tmp_path = tempfile.mkstemp(dir=self.notes_dir, suffix=".part")
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in self.iter_bytes(title):
+                        f.write(chunk)
+                os.replace(tmp_path, os.path.join(self.notes_dir, f"{title}.txt"))
+            os.remove(self.manifest_file)
+            shutil.rmtree(self.objects_dir)
+            self.manifest = {}
+            self.blobs = {}
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def _save_manifest(self) -> None:
+        tmp_file = f"{self.manifest_file}.tmp"
+        with tracked_open(tmp_file, "w", label=os.path.basename(self.manifest_file)) as f:
+            f.write(json.dumps(self.manifest))
+        os.replace(tmp_file, self.manifest_file)
+
+    def _entry(self, title: str) -> dict:
+        entry = self.manifest.get(title)
+        if entry is None:
+            raise FileNotFoundError(f"Note '{title}' not found")
+        return entry
+
+    def _point(self, title: str, digest: str, compressed: bool) -> None:
+        """Point a title at a stored body and drop the body it used to point at."""
+        old = self.manifest.get(title)
+        blob = self.blobs.setdefault(digest, [0, compressed])
+        blob[0] += 1
+        self.manifest[title] = {"hash": digest, "compressed": blob[1]}
+        if old is not None:
+            self._release(old["hash"])
+        self._save_manifest()
+
+    def _release(self, digest: str) -> None:
+        blob = self.blobs[digest]
+        blob[0] -= 1
+        if blob[0] == 0:
+            del self.blobs[digest]
+            try:
+                os.remove(self._blob_path(digest))
+            except FileNotFoundError:
+                pass
+
+    def path(self, title: str):
+        """
+        Return the path of the stored body of a note.
+
+        Args:
+            title (str): The title of the note
+
+        Returns:
+            str | None: Path of the body, or None if the note does not exist
+        """
+        entry = self.manifest.get(title)
+        return self._blob_path(entry["hash"]) if entry else None
+
+    def titles(self) -> list:
+        """
+        List the titles of all stored notes.
+
+        Returns:
+            list: Note titles
+        """
+        return list(self.manifest)
+
+    def version(self, title: str) -> list:
+        """
+        Return a value that changes whenever the note's content changes.
+
+        Args:
+            title (str): The title of the note
+
+        Returns:
+            list: [content hash]
+
+        Raises:
+            FileNotFoundError: If the note does not exist
+        """
+        return [self._entry(title)["hash"]]
+
+    def is_compressed(self, title: str) -> bool:
+        """
+        Check whether a note's body is stored compressed.
+
+        Args:
+            title (str): The title of the note
+
+        Returns:
+            bool: True if the body is gzip-compressed
+
+        Raises:
+            FileNotFoundError: If the note does not exist
+        """
+        return self._entry(title)["compressed"]
+
+    def read(self, title: str) -> tuple:
+        """
+        Read a note, decompressing it if needed.
+
+        Args:
+            title (str): The title of the note
+
+        Returns:
+            tuple: (content, path, stat) of the body that was read
+
+        Raises:
+            FileNotFoundError: If the note does not exist
+        """
+        entry = self._entry(title)
+        path = self._blob_path(entry["hash"])
+        with tracked_open(path, "rb", label=NOTE_LABEL) as f:
+            stat = os.fstat(f.fileno())
+            data = f.read()
+        if entry["compressed"]:
+            data = gzip.decompress(data)
+        return data.decode("utf-8"), path, stat
+
+    def open_text(self, title: str):
+        """
+        Open a note for reading line by line, decompressing on the fly.
+
+        Args:
+            title (str): The title of the note
+
+        Returns:
+            file: A text file object
+
+        Raises:
+            FileNotFoundError: If the note does not exist
+        """
+        entry = self._entry(title)
+        path = self._blob_path(entry["hash"])
+        if entry["compressed"]:
+            return gzip.open(path, "rt", encoding="utf-8")
+        return tracked_open(path, "r", label=NOTE_LABEL, encoding="utf-8")
+
+    def iter_bytes(self, title: str):
+        """
+        Yield a note's uncompressed content in chunks.
+
+        Args:
+            title (str): The title of the note
+
+        Yields:
+            bytes: Consecutive chunks of the note
+        """
+        entry = self._entry(title)
+        path = self._blob_path(entry["hash"])
+        with tracked_open(path, "rb", label=NOTE_LABEL) as raw:
+            f = gzip.open(raw, "rb") if entry["compressed"] else raw
+            while chunk := f.read(CHUNK_SIZE):
+                yield chunk
+
+    def write(self, title: str, content: str, create: bool = True) -> list:
+        """
+        Write a note, storing its body only if no other note has the same one.
+
+        Args:
+            title (str): The title of the note
+            content (str): Text to write
+            create (bool): Whether to create the note if it does not exist
+
+        Returns:
+            list: Version of the written content, as returned by version()
+
+        Raises:
+            FileNotFoundError: If create is False and the note does not exist
+        """
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        compressed = len(data) >= self.compress_min_bytes
+
+        with self._lock:
+            if not create:
+                self._entry(title)
+            if digest not in self.blobs:
+                if compressed:
+                    data = gzip.compress(data, mtime=0)
+                blob_path = self._blob_path(digest)
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                tmp_path = f"{blob_path}.tmp"
+                with tracked_open(tmp_path, "wb", label=NOTE_LABEL) as f:
+                    f.write(data)
+                os.replace(tmp_path, blob_path)
+            self._point(title, digest, compressed)
+        return [digest]
+
+    def write_file(self, title: str, tmp_path: str) -> list:
+        """
+        Store an uploaded file as a note's content.
+
+        The file is hashed and, if needed, compressed in chunks, so large
+        uploads are never loaded into memory.
+
+        Args:
+            title (str): The title of the note
+            tmp_path (str): Temporary file in the notes directory; it is moved
+                or removed by this call
+
+        Returns:
+            list: Version of the stored content, as returned by version()
+        """
+        sha = hashlib.sha256()
+        with open(tmp_path, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        compressed = os.path.getsize(tmp_path) >= self.compress_min_bytes
+
+        with self._lock:
+            if digest in self.blobs:
+                os.remove(tmp_path)
+            else:
+                blob_path = self._blob_path(digest)
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                if compressed:
+                    with open(tmp_path, "rb") as src, gzip.open(f"{blob_path}.tmp", "wb") as dst:
+                        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+                    os.remove(tmp_path)
+                    tmp_path = f"{blob_path}.tmp"
+                os.replace(tmp_path, blob_path)
+            self._point(title, digest, compressed)
+        return [digest]
+
+    def remove(self, title: str) -> None:
+        """
+        Delete a note, and its body if no other note shares it.
+
+        Args:
+            title (str): The title of the note
+
+        Raises:
+            FileNotFoundError: If the note does not exist
+        """
+        with self._lock:
+            entry = self._entry(title)
+            del self.manifest[title]
+            self._release(entry["hash"])
+            self._save_manifest()
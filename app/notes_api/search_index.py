@@ -0,0 +1,372 @@
+"""
+Search Index Module for Notes API
+
+This module keeps an inverted index of note contents so notes can be searched
+without opening every file in the notes directory. The index is updated
+incrementally whenever a note is created, updated or deleted, and is persisted
+to disk so a restart only re-tokenizes notes that changed while the API was down.
+Saves can be delayed and batched; a save that never happened is harmless because
+startup re-tokenizes any note whose content no longer matches the saved index.
+A save copies the index under its lock and writes the copy out note by note, so
+searches and updates are not held up while a large index is written.
+
+Positions are kept once per note and token: as a plain int for a token that
+appears once in a note, and as a 32-bit array otherwise.
+
+Queries are ranked with BM25. Text wrapped in double quotes is treated as a
+phrase and only matches notes where the words appear next to each other.
+
+Classes:
+    NoteIndex: Inverted index over note contents with BM25 ranking
+
+Functions:
+    tokenize(text): Split text into lowercase word tokens
+    parse_query(query): Split a query into free terms and quoted phrases
+"""
+
+from array import array
+import json
+import math
+import os
+import re
+import sys
+import threading
+from service_metrics import tracked_open
+
+TOKEN_PATTERN = re.compile(r"\w+")
+PHRASE_PATTERN = re.compile(r'"([^"]*)"')
+
+# BM25 tuning parameters (standard defaults)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+def tokenize(text: str) -> list:
+    """
+    Split text into lowercase word tokens.
+
+    Args:
+        text (str): The text to tokenize
+
+    Returns:
+        list: List of tokens in the order they appear
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+def parse_query(query: str) -> tuple:
+    """
+    Split a search query into free terms and quoted phrases.
+
+    Args:
+        query (str): The raw query, e.g. 'senior "code review"'
+
+    Returns:
+        tuple: (terms, phrases) where terms is a list of tokens and phrases is
+            a list of token lists, one per quoted phrase
+    """
+    phrases = []
+    for match in PHRASE_PATTERN.findall(query):
+        tokens = tokenize(match)
+        if tokens:
+            phrases.append(tokens)
+    terms = tokenize(PHRASE_PATTERN.sub(" ", query))
+    return terms, phrases
+
+def _pack_terms(terms: dict) -> dict:
+    """Store each token's positions as an int if it appears once, else as an array."""
+    return {
+        sys.intern(token): positions[0] if len(positions) == 1 else array("I", positions)
+        for token, positions in terms.items()
+    }
+
+def _positions(value) -> tuple:
+    """Return the positions stored for a token as a sequence."""
+    return (value,) if isinstance(value, int) else value
+
+def _json_default(value) -> list:
+    return value.tolist()
+
+class NoteIndex:
+    """
+    Inverted index over note contents.
+
+    Each token maps to the notes containing it, and each note to the positions
+    its tokens appear at, which is enough for both BM25 scoring and phrase
+    matching. All public methods are safe to call from several threads at once.
+
+    Attributes:
+        store: Note storage (FileStore or ContentStore) the notes are read from
+        index_file (str): Path of the persisted index
+        postings (dict): token -> set of titles containing it
+        documents (dict): title -> {token: position int, or array of positions}
+        doc_lengths (dict): title -> number of tokens in the note
+        versions (dict): title -> store version of the indexed content
+        save_delay (float): Seconds to wait before persisting a change, so bursts
+            of writes are saved once (0 saves immediately)
+    """
+
+    def __init__(self, store, index_file: str, save_delay: float = 0):
+        self.store = store
+        self.index_file = index_file
+        self.save_delay = save_delay
+        self.postings = {}
+        self.documents = {}
+        self.doc_lengths = {}
+        self.versions = {}
+        self.total_length = 0
+        self._lock = threading.RLock()
+        # Held while a save writes, so saves reach the disk in the order they copied the index
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+
+    def _add_terms(self, title: str, terms: dict, length: int) -> None:
+        for token in terms:
+            self.postings.setdefault(token, set()).add(title)
+        self.documents[title] = terms
+        self.doc_lengths[title] = length
+        self.total_length += length
+
+    def _index_tokens(self, title: str, tokens, save: bool, version) -> None:
+        terms = {}
+        length = 0
+        for position, token in enumerate(tokens):
+            terms.setdefault(token, []).append(position)
+            length = position + 1
+        terms = _pack_terms(terms)
+
+        with self._lock:
+            self.remove(title, save=False)
+            self._add_terms(title, terms, length)
+
+            if version is None:
+                try:
+                    version = self.store.version(title)
+                except OSError:
+                    pass
+            if version is not None:
+                self.versions[title] = version
+
+        # Saving takes the save lock, which is never waited for while holding this one
+        if save:
+            self._schedule_save()
+
+    def add(self, title: str, content: str, save: bool = True, version=None) -> None:
+        """
+        Index (or re-index) a note.
+
+        Pass the version returned by the store's write, so the index never
+        records the version of a later write next to this content.
+
+        Args:
+            title (str): The title of the note
+            content (str): The full text of the note
+            save (bool): Whether to persist the index afterwards
+            version (list, optional): Store version of content; read from the
+                store when not given
+        """
+        self._index_tokens(title, tokenize(content), save, version)
+
+    def add_file(self, title: str, save: bool = True, version=None) -> None:
+        """
+        Index (or re-index) a note straight from storage.
+
+        The note is tokenized line by line, so large notes are never loaded
+        into memory as a whole.
+
+        Args:
+            title (str): The title of the note
+            save (bool): Whether to persist the index afterwards
+            version (list, optional): Store version of the note; read from the
+                store when not given
+        """
+        with self.store.open_text(title) as f:
+            tokens = (token for line in f for token in tokenize(line))
+            self._index_tokens(title, tokens, save, version)
+
+    def remove(self, title: str, save: bool = True) -> None:
+        """
+        Drop a note from the index.
+
+        Args:
+            title (str): The title of the note
+            save (bool): Whether to persist the index afterwards
+        """
+        with self._lock:
+            terms = self.documents.pop(title, None)
+            if terms is None:
+                return
+
+            for token in terms:
+                notes = self.postings[token]
+                notes.discard(title)
+                if not notes:
+                    del self.postings[token]
+            self.total_length -= self.doc_lengths.pop(title)
+            self.versions.pop(title, None)
+
+        if save:
+            self._schedule_save()
+
+    def _schedule_save(self) -> None:
+        if self.save_delay <= 0:
+            self.save()
+            return
+        with self._lock:
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self._flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def _flush(self) -> None:
+        with self._lock:
+            self._save_timer = None
+        self.save()
+
+    def save(self) -> None:
+        """
+        Persist the index to disk.
+
+        Only copying the index's top-level dictionaries happens under the lock;
+        a note's terms are replaced rather than changed when it is re-indexed,
+        so the copy stays consistent while it is written out. The file is written
+        to a temporary path first and then moved into place so a crash mid-write
+        never leaves a half-written index behind.
+        """
+        with self._save_lock:
+            with self._lock:
+                documents = dict(self.documents)
+                doc_lengths = dict(self.doc_lengths)
+                versions = dict(self.versions)
+
+            tmp_file = f"{self.index_file}.tmp"
+            with tracked_open(tmp_file, "w", label=os.path.basename(self.index_file)) as f:
+                # One note at a time, so other threads get to run in between
+                f.write('{"notes": {')
+                for i, (title, terms) in enumerate(documents.items()):
+                    entry = {"version": versions.get(title), "length": doc_lengths[title], "terms": terms}
+                    f.write(", " if i else "")
+                    f.write(f"{json.dumps(title)}: {json.dumps(entry, default=_json_default)}")
+                f.write("}}")
+            os.replace(tmp_file, self.index_file)
+
+    def load(self) -> None:
+        """
+        Load the persisted index and bring it in line with the stored notes.
+
+        Notes whose version (file size and modification time, or content hash)
+        changed since the index was saved, and notes that were never indexed, are
+        re-tokenized. Entries for notes that no longer exist are dropped.
+        Unchanged notes are not read.
+        """
+        stored = {}
+        if os.path.exists(self.index_file):
+            try:
+                with tracked_open(self.index_file, "r") as f:
+                    # Pack each note's terms as soon as it is parsed
+                    stored = json.load(f, object_hook=self._load_entry).get("notes", {})
+            except (OSError, ValueError):
+                stored = {}
+
+        titles = self.store.titles()
+
+        with self._lock:
+            changed = False
+            for title in titles:
+                entry = stored.get(title)
+                try:
+                    current_version = self.store.version(title)
+                except OSError:
+                    continue
+                if entry and entry.get("version") == current_version:
+                    self._add_terms(title, entry["terms"], entry["length"])
+                    self.versions[title] = current_version
+                    continue
+                self.add_file(title, save=False)
+                changed = True
+
+        if changed or set(stored) - set(titles):
+            self.save()
+
+    @staticmethod
+    def _load_entry(entry: dict) -> dict:
+        # Called for every parsed object; only note entries are changed
+        if entry.keys() == {"version", "length", "terms"} and isinstance(entry["length"], int):
+            entry["terms"] = _pack_terms({
+                token: _positions(positions) for token, positions in entry["terms"].items()
+            })
+        return entry
+
+    def _has_phrase(self, title: str, phrase: list) -> bool:
+        """Check whether the tokens of a phrase appear consecutively in a note."""
+        terms = self.documents[title]
+        first = terms.get(phrase[0])
+        if first is None:
+            return False
+        following = []
+        for token in phrase[1:]:
+            positions = terms.get(token)
+            if positions is None:
+                return False
+            following.append(set(_positions(positions)))
+        return any(
+            all(start + offset in positions for offset, positions in enumerate(following, 1))
+            for start in _positions(first)
+        )
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """
+        Search notes and rank them with BM25.
+
+        Free terms match any note containing at least one of them. Quoted phrases
+        must all be present in a note for it to match.
+
+        Args:
+            query (str): The search query
+            limit (int): Maximum number of results to return
+
+        Returns:
+            list: Dictionaries with "title" and "score", best match first
+        """
+        terms, phrases = parse_query(query)
+        if not terms and not phrases:
+            return []
+        with self._lock:
+            return self._rank(terms, phrases, limit)
+
+    def _rank(self, terms: list, phrases: list, limit: int) -> list:
+        # Phrases filter the candidate set, free terms widen it
+        candidates = None
+        for phrase in phrases:
+            notes = self.postings.get(phrase[0], ())
+            matching = {title for title in notes if self._has_phrase(title, phrase)}
+            candidates = matching if candidates is None else candidates & matching
+        if candidates is None:
+            candidates = set()
+            for token in terms:
+                candidates.update(self.postings.get(token, ()))
+
+        if not candidates:
+            return []
+
+        scoring_terms = set(terms)
+        for phrase in phrases:
+            scoring_terms.update(phrase)
+
+        doc_count = len(self.doc_lengths)
+        avg_length = self.total_length / doc_count if doc_count else 0
+        scores = dict.fromkeys(candidates, 0.0)
+        for token in scoring_terms:
+            notes = self.postings.get(token)
+            if not notes:
+                continue
+            idf = math.log(1 + (doc_count - len(notes) + 0.5) / (len(notes) + 0.5))
+            for title in candidates & notes:
+                positions = self.documents[title][token]
+                tf = 1 if isinstance(positions, int) else len(positions)
+                norm = 1 - BM25_B + BM25_B * (self.doc_lengths[title] / avg_length if avg_length else 0)
+                scores[title] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [
+            {"title": title, "score": round(score, 4)}
+            for title, score in ranked[:limit]
+        ]
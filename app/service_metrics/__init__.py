@@ -0,0 +1,29 @@
+"""
+Service Metrics Package
+
+Shared request timing, file I/O counters, Prometheus /metrics endpoint and
+opt-in sampling profiler used by every API in this repository.
+
+Usage:
+    from service_metrics import install_metrics, tracked_open
+
+    app = FastAPI(...)
+    install_metrics(app, "contacts")
+
+    with tracked_open("students.json", "r") as f:
+        data = json.load(f)
+"""
+
+from .file_stats import record_io, tracked_open
+from .middleware import MetricsMiddleware, install_metrics
+from .registry import Counter, Histogram, render
+
+__all__ = [
+    "Counter",
+    "Histogram",
+    "MetricsMiddleware",
+    "install_metrics",
+    "record_io",
+    "render",
+    "tracked_open",
+]
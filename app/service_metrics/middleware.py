@@ -0,0 +1,132 @@
+"""
+Metrics Middleware Module
+
+This module times every HTTP request a service handles and adds the /metrics
+and (when enabled) /debug/profile endpoints to it.
+
+Request latency is recorded per service, method, route and status code. The
+route is the path template ("/contacts/{name}"), not the requested path, so
+each endpoint is one series however many different names it is called with.
+
+Classes:
+    MetricsMiddleware: ASGI middleware recording request latency
+
+Functions:
+    install_metrics(app, service): Add the middleware and endpoints to an app
+"""
+
+import os
+import time
+from fastapi import HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from .profiler import ProfilerBusyError, format_collapsed, format_report, sample_stacks
+from .registry import Histogram, render
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle an HTTP request, including sending the response body.",
+    ("service", "method", "route", "status")
+)
+
+# Route label for requests that matched no route (usually 404s)
+UNMATCHED_ROUTE = "<unmatched>"
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency of every HTTP request.
+
+    It wraps the raw ASGI app rather than using BaseHTTPMiddleware, so streamed
+    responses pass through untouched and are timed until their last chunk.
+
+    Attributes:
+        app: The wrapped ASGI application
+        service (str): Value of the "service" label
+    """
+
+    def __init__(self, app, service: str):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                (self.service, scope["method"], getattr(route, "path", UNMATCHED_ROUTE), str(status)),
+                time.perf_counter() - start
+            )
+
+def metrics():
+    """
+    Return every metric of this process in Prometheus text format.
+
+    Returns:
+        PlainTextResponse: The exposition text
+    """
+    return PlainTextResponse(render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+async def profile(
+    seconds: float = Query(10, gt=0, le=60),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    format: str = Query("text", pattern="^(text|collapsed)$"),
+    limit: int = Query(40, ge=1)
+):
+    """
+    Sample what every thread is doing for a while and report the hot paths.
+
+    Args:
+        seconds (float): How long to sample for (at most 60)
+        interval_ms (float): Milliseconds between samples
+        format (str): "text" for a table of functions, "collapsed" for flame graph input
+        limit (int): Number of functions in the text table
+
+    Returns:
+        PlainTextResponse: The report
+
+    Raises:
+        HTTPException: 409 if another profile is being captured
+
+    Example:
+        GET /debug/profile?seconds=30&format=collapsed
+    """
+    try:
+        stacks, _ = await run_in_threadpool(sample_stacks, seconds, interval_ms / 1000)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "collapsed":
+        return PlainTextResponse(format_collapsed(stacks))
+    return PlainTextResponse(format_report(stacks, limit))
+
+def install_metrics(app, service: str) -> None:
+    """
+    Add request timing, GET /metrics and, if enabled, GET /debug/profile to an app.
+
+    The profiler endpoint is only added when the PROFILER_ENABLED environment
+    variable is "1", since it lets callers keep a thread busy for up to a minute.
+
+    Args:
+        app (FastAPI): The application
+        service (str): Name used as the "service" label
+    """
+    app.add_middleware(MetricsMiddleware, service=service)
+    app.add_api_route("/metrics", metrics, methods=["GET"], include_in_schema=False)
+    if os.environ.get("PROFILER_ENABLED", "0") == "1":
+        app.add_api_route("/debug/profile", profile, methods=["GET"], include_in_schema=False)
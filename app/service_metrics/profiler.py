@@ -0,0 +1,127 @@
+"""
+Sampling Profiler Module
+
+This module captures where a running service spends its time. For a given
+number of seconds it looks at the Python stack of every thread a few hundred
+times per second and counts how often each function shows up.
+
+A sampler is used instead of cProfile because cProfile only sees the thread
+that started it, while the services run handlers on the event loop and on
+worker threads. Sampling also costs almost nothing for the code being measured,
+so it is safe to run against production traffic.
+
+Samples of threads that are only waiting for work (an idle event loop or worker
+thread) are left out, so the report shows what the busy threads were doing.
+
+Classes:
+    ProfilerBusyError: Raised when a profile is already being captured
+
+Functions:
+    sample_stacks(seconds, interval): Sample every thread's stack
+    format_report(stacks, limit): Summarise samples as a table of functions
+    format_collapsed(stacks): Render samples as collapsed stacks for flame graphs
+"""
+
+from collections import Counter
+import os
+import sys
+import threading
+import time
+
+# Leaf functions of threads that are waiting for work: (file name, function)
+IDLE_FUNCTIONS = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("_threads.py", "run"),
+}
+
+_profile_lock = threading.Lock()
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is requested while another one is being captured."""
+
+def _frame_name(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> tuple:
+    """
+    Sample the stack of every thread except the caller's.
+
+    Args:
+        seconds (float): How long to sample for
+        interval (float): Seconds between samples
+
+    Returns:
+        tuple: (Counter of stack -> samples, number of sampling rounds); each
+            stack is a tuple of "file.py:function" names, outermost first
+
+    Raises:
+        ProfilerBusyError: If another profile is being captured
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already being captured")
+    try:
+        own_thread = threading.get_ident()
+        stacks = Counter()
+        rounds = 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FUNCTIONS:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                stacks[tuple(reversed(stack))] += 1
+            rounds += 1
+            time.sleep(interval)
+        return stacks, rounds
+    finally:
+        _profile_lock.release()
+
+def format_report(stacks: Counter, limit: int = 40) -> str:
+    """
+    Summarise sampled stacks as a table of the hottest functions.
+
+    "self" counts samples where the function itself was running, "total"
+    samples where it was anywhere on the stack.
+
+    Args:
+        stacks (Counter): Samples per stack, from sample_stacks()
+        limit (int): Number of functions to list
+
+    Returns:
+        str: The report
+    """
+    total_samples = sum(stacks.values())
+    own = Counter()
+    cumulative = Counter()
+    for stack, count in stacks.items():
+        own[stack[-1]] += count
+        for name in set(stack):
+            cumulative[name] += count
+
+    lines = [f"{total_samples} busy samples", "", f"{'self %':>8}{'total %':>9}  function"]
+    for name, total in cumulative.most_common(limit):
+        lines.append(
+            f"{100 * own[name] / total_samples:>8.1f}{100 * total / total_samples:>9.1f}  {name}"
+        )
+    return "\n".join(lines) + "\n"
+
+def format_collapsed(stacks: Counter) -> str:
+    """
+    Render sampled stacks in the collapsed format read by flamegraph.pl and speedscope.
+
+    Args:
+        stacks (Counter): Samples per stack, from sample_stacks()
+
+    Returns:
+        str: One "outer;...;inner count" line per stack
+    """
+    return "".join(f"{';'.join(stack)} {count}\n" for stack, count in stacks.most_common())
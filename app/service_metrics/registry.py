@@ -0,0 +1,144 @@
+"""
+Metric Registry Module
+
+This module holds the counters and histograms collected by the services and
+renders them in the Prometheus text exposition format.
+
+Metrics live in the memory of the process that recorded them. When a service
+runs with several uvicorn workers, each worker reports its own numbers and
+Prometheus sums them across scrapes of the individual workers.
+
+Classes:
+    Counter: Monotonic counter with labels
+    Histogram: Bucketed distribution of observed values with labels
+
+Functions:
+    render(): Return every registered metric in Prometheus text format
+"""
+
+from bisect import bisect_left
+import threading
+
+# Latency buckets in seconds, from 1 ms to 10 s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Every metric created in this process, in creation order
+METRICS = []
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """
+    A value that only goes up, kept separately for each combination of labels.
+
+    Attributes:
+        name (str): Metric name, ending in "_total" by convention
+        help (str): One-line description shown by Prometheus
+        labels (tuple): Names of the labels
+        values (dict): label values -> current count
+    """
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+        METRICS.append(self)
+
+    def inc(self, label_values: tuple = (), amount=1) -> None:
+        """
+        Increase the counter.
+
+        Args:
+            label_values (tuple): Values of the labels, in order
+            amount (int | float): How much to add
+        """
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self.values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    """
+    Counts observed values into cumulative buckets, per combination of labels.
+
+    Attributes:
+        name (str): Metric name
+        help (str): One-line description shown by Prometheus
+        labels (tuple): Names of the labels
+        buckets (tuple): Upper bounds of the buckets, in increasing order
+        values (dict): label values -> [bucket counts..., sum, count]
+    """
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self._lock = threading.Lock()
+        METRICS.append(self)
+
+    def observe(self, label_values: tuple, value: float) -> None:
+        """
+        Record one observation.
+
+        Args:
+            label_values (tuple): Values of the labels, in order
+            value (float): The observed value
+        """
+        # Counts are stored per bucket and made cumulative when rendered
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self.values.get(label_values)
+            if state is None:
+                state = self.values[label_values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[position] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((label_values, list(state)) for label_values, state in self.values.items())
+        for label_values, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                labels = _format_labels(self.labels, label_values, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {state[-1]}")
+        return lines
+
+def render() -> str:
+    """
+    Return every registered metric in Prometheus text format.
+
+    Returns:
+        str: The exposition text, ending with a newline
+    """
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
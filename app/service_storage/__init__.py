@@ -0,0 +1,29 @@
+"""
+Service Storage Package
+
+Storage helpers shared by every API in this repository: a byte-bounded file
+cache with a single process-wide budget, cached JSON file access built on top
+of it, and a lock that keeps a second process away from data only one process
+may own.
+
+Usage:
+    from service_storage import read_json, load_json, save_json, shared_cache
+
+    students = read_json(DATA_FILE)        # cached, read-only
+    students = load_json(DATA_FILE)        # private copy to modify
+    save_json(students, DATA_FILE)
+"""
+
+from .file_cache import FileCache, shared_cache
+from .json_store import load_json, read_json, save_json
+from .process_lock import DataInUseError, claim_exclusive
+
+__all__ = [
+    "DataInUseError",
+    "FileCache",
+    "claim_exclusive",
+    "load_json",
+    "read_json",
+    "save_json",
+    "shared_cache",
+]
@@ -0,0 +1,143 @@
+"""
+File Cache Module
+
+This module provides a bounded, least-recently-used cache of values read from
+files, so frequently read files are served from memory instead of being re-read
+(and re-parsed) from disk on every request.
+
+The cache is limited by the total size of the cached values rather than by the
+number of entries. Every cached value remembers the modification time and size
+of the file it was read from, and a lookup re-checks them with a cheap os.stat
+call, so edits made outside the API are picked up on the next read.
+
+One instance, shared_cache, is used by every API in the process, so when the
+APIs run together behind the gateway they share a single memory budget.
+
+Settings (environment variables):
+    FILE_CACHE_MAX_BYTES: Budget of shared_cache in bytes (default 64 MiB)
+
+Classes:
+    FileCache: Byte-bounded LRU cache of file contents
+"""
+
+from collections import OrderedDict
+import os
+import sys
+import threading
+
+class FileCache:
+    """
+    Byte-bounded LRU cache of file contents keyed by file path.
+
+    Attributes:
+        max_bytes (int): Maximum total size of cached values
+        current_bytes (int): Total size of the values currently cached
+        hits (int): Number of reads served from the cache
+        misses (int): Number of reads that had to go to disk
+        evictions (int): Number of values dropped to stay within the budget
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # path -> (value, (mtime_ns, size), charged size), oldest first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _drop(self, path: str) -> None:
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
+
+    def get(self, path: str):
+        """
+        Look up a file, checking that it has not changed since it was cached.
+
+        Args:
+            path (str): Path of the file
+
+        Returns:
+            The cached value, or None on a miss or stale entry
+        """
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                self.misses += 1
+                return None
+        # Stat outside the lock so a slow disk does not hold up other lookups
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        with self._lock:
+            if stat is not None and (stat.st_mtime_ns, stat.st_size) == entry[1]:
+                if self._entries.get(path) is entry:
+                    self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[0]
+            if self._entries.get(path) is entry:
+                self._drop(path)
+            self.misses += 1
+            return None
+
+    def put(self, path: str, value, stat: os.stat_result, size: int = None) -> None:
+        """
+        Cache the value read from a file.
+
+        Values larger than the whole budget are not cached. Least recently used
+        values are evicted until the new one fits.
+
+        Args:
+            path (str): Path of the file
+            value: The content read from the file, or a value parsed from it
+            stat (os.stat_result): Stat of the file taken before it was read
+            size (int, optional): Size charged against the budget in bytes;
+                defaults to the memory held by a str or bytes value
+        """
+        if size is None:
+            # Bytes in memory, not characters: non-ASCII text takes 2 or 4 bytes a character
+            size = sys.getsizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._drop(path)
+            while self._entries and self.current_bytes + size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted[2]
+                self.evictions += 1
+            self._entries[path] = (value, (stat.st_mtime_ns, stat.st_size), size)
+            self.current_bytes += size
+
+    def invalidate(self, path: str) -> None:
+        """
+        Remove a file from the cache after it was written or deleted.
+
+        Args:
+            path (str): Path of the file
+        """
+        with self._lock:
+            self._drop(path)
+
+    def stats(self) -> dict:
+        """
+        Report cache usage.
+
+        Returns:
+            dict: Entry count, byte usage and budget, hits, misses, hit ratio and evictions
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+shared_cache = FileCache(int(os.environ.get("FILE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))))
@@ -0,0 +1,119 @@
+"""
+JSON Store Module
+
+This module reads and writes the JSON data files of the APIs (applications,
+students, products and cart) through the shared file cache.
+
+read_json() returns the parsed document from the cache while the file is
+unchanged, so listing and searching endpoints no longer re-parse the whole file
+on every request. The cached document is shared by every caller and must not be
+modified. Code that changes a document loads a private copy with load_json()
+and writes it back with save_json().
+
+Cached documents are charged against the cache budget at their size in memory,
+which for parsed JSON is several times the size of the file.
+
+save_json() writes to a temporary file and moves it into place, so readers in
+other threads or workers never see a half-written file.
+
+Functions:
+    parsed_size(data): Estimate the memory held by a parsed JSON document
+    read_json(path): Return a file's parsed JSON, shared and read-only
+    load_json(path): Return a fresh, modifiable copy of a file's parsed JSON
+    save_json(data, path, indent): Atomically write data as JSON
+"""
+
+import json
+import os
+import sys
+import threading
+from service_metrics import tracked_open
+from .file_cache import shared_cache
+
+def load_json(path: str):
+    """
+    Parse a JSON file into a new object the caller may modify.
+
+    Args:
+        path (str): Path of the file
+
+    Returns:
+        The parsed document
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        ValueError: If the file is not valid JSON
+    """
+    with tracked_open(path, "r") as f:
+        return json.load(f)
+
+def parsed_size(data) -> int:
+    """
+    Estimate the memory held by a parsed JSON document.
+
+    Adds up sys.getsizeof() of every dict, list, string and number in the
+    document. Dictionary keys, which the json module shares between objects,
+    are counted once.
+
+    Args:
+        data: The parsed document
+
+    Returns:
+        int: Estimated size in bytes
+    """
+    size = 0
+    seen_keys = set()
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        size += sys.getsizeof(value)
+        if isinstance(value, dict):
+            for key in value:
+                if id(key) not in seen_keys:
+                    seen_keys.add(id(key))
+                    size += sys.getsizeof(key)
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return size
+
+def read_json(path: str):
+    """
+    Return the parsed JSON of a file, from the shared cache when it is unchanged.
+
+    The returned object is shared with other requests; do not modify it.
+
+    Args:
+        path (str): Path of the file
+
+    Returns:
+        The parsed document
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        ValueError: If the file is not valid JSON
+    """
+    data = shared_cache.get(path)
+    if data is not None:
+        return data
+    with tracked_open(path, "r") as f:
+        stat = os.fstat(f.fileno())
+        data = json.load(f)
+    shared_cache.put(path, data, stat, size=parsed_size(data))
+    return data
+
+def save_json(data, path: str, indent: int = 4) -> None:
+    """
+    Write data to a JSON file, replacing it atomically.
+
+    Args:
+        data: The document to save
+        path (str): Path of the file
+        indent (int): Indentation of the written JSON
+    """
+    # One temporary file per thread, so concurrent saves do not interleave
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with tracked_open(tmp_path, "w", label=os.path.basename(path)) as f:
+        json.dump(data, f, indent=indent)
+    os.replace(tmp_path, path)
+    shared_cache.invalidate(path)
@@ -0,0 +1,62 @@
+"""
+Process Lock Module
+
+Some API data can only be owned by one process at a time. The Contacts API
+rolls its write-ahead log over into snapshots, and the Notes API keeps its
+search index and content store manifest in memory and writes them back from
+there. A second uvicorn worker (or a second server) on the same data would
+silently overwrite the first one's changes.
+
+claim_exclusive() takes an exclusive lock on a file next to such data when the
+API starts, so the second process fails at startup with a clear error instead.
+The lock is an flock on a file kept open by the process, so the operating
+system releases it when the process exits, even after a crash. Where fcntl is
+not available (Windows) no lock is taken.
+
+Classes:
+    DataInUseError: Raised when another process holds the lock
+
+Functions:
+    claim_exclusive(lock_file, hint): Make this process the only user of some data
+"""
+
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Absolute lock file path -> open file holding the lock for this process
+_held = {}
+_held_lock = threading.Lock()
+
+class DataInUseError(RuntimeError):
+    """Raised when another process already holds the lock on some data."""
+
+def claim_exclusive(lock_file: str, hint: str = "") -> None:
+    """
+    Take an exclusive lock on a file for the lifetime of this process.
+
+    Claiming the same file again from this process does nothing, so the
+    gateway and the API it imports can both claim the same data.
+
+    Args:
+        lock_file (str): Path of the lock file; it is created if needed
+        hint (str): What to do instead, added to the error message
+
+    Raises:
+        DataInUseError: If another process holds the lock
+    """
+    path = os.path.abspath(lock_file)
+    with _held_lock:
+        if fcntl is None or path in _held:
+            return
+        f = open(path, "a")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            raise DataInUseError(f"{path} is locked by another process. {hint}".strip())
+        _held[path] = f
@@ -8,37 +8,60 @@ This module handles the core shopping cart functionality including:
 - Calculating totals
 
 The module uses JSON files for persistent storage of both products and cart data.
+Files are accessed through the shared storage layer (see service_storage), so unchanged
+files are served from the shared cache and reads and writes are counted in the metrics.
 """
 
-import json
 import os
+from service_storage import load_json, read_json, save_json
 
-CART_FILE = "cart_data.json"
-PRODUCTS_FILE = "product.json"
+# Stored next to this module unless CART_FILE / PRODUCTS_FILE point elsewhere
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+CART_FILE = os.environ.get("CART_FILE", os.path.join(SERVICE_DIR, "cart_data.json"))
+PRODUCTS_FILE = os.environ.get("PRODUCTS_FILE", os.path.join(SERVICE_DIR, "product.json"))
 
-def load_products() -> list:
+def load_products(for_update: bool = False) -> list:
     """
     Load product inventory from JSON file.
 
+    Unless for_update is set, the list comes from the shared cache and must not
+    be modified.
+
+    Args:
+        for_update (bool): Return a private copy that may be modified and saved
+
     Returns:
         list: List of product dictionaries, empty list if file doesn't exist
     """
     if not os.path.exists(PRODUCTS_FILE):
         return []
-    with open(PRODUCTS_FILE, 'r') as f:
-        return json.load(f)
+    return load_json(PRODUCTS_FILE) if for_update else read_json(PRODUCTS_FILE)
+
+def save_products(products: list) -> None:
+    """
+    Save product inventory to JSON file.
+
+    Args:
+        products (list): List of products to save
+    """
+    save_json(products, PRODUCTS_FILE)
 
-def load_cart() -> list:
+def load_cart(for_update: bool = False) -> list:
     """
     Load current cart contents from JSON file.
 
+    Unless for_update is set, the list comes from the shared cache and must not
+    be modified.
+
+    Args:
+        for_update (bool): Return a private copy that may be modified and saved
+
     Returns:
         list: List of cart items, empty list if file doesn't exist
     """
     if not os.path.exists(CART_FILE):
         return []
-    with open(CART_FILE, 'r') as f:
-        return json.load(f)
+    return load_json(CART_FILE) if for_update else read_json(CART_FILE)
 
 def save_cart(cart: list) -> None:
     """
@@ -47,8 +70,7 @@ def save_cart(cart: list) -> None:
     Args:
         cart (list): List of cart items to save
     """
-    with open(CART_FILE, 'w') as f:
-        json.dump(cart, f, indent=4)
+    save_json(cart, CART_FILE)
 
 def add_to_cart(product_id: int, qty: int) -> dict:
     """
@@ -76,7 +98,7 @@ def add_to_cart(product_id: int, qty: int) -> dict:
             raise ValueError("Product not found")
 
         # Load current cart and check for existing item
-        cart = load_cart()
+        cart = load_cart(for_update=True)
         existing_item = next((item for item in cart if item['id'] == product_id), None)
 
         if existing_item:
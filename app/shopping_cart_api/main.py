@@ -9,18 +9,25 @@ Features:
     - Cart operations (add items, view cart, checkout)
     - Persistent storage using JSON files
     - Basic error handling
+    - Request latency and file I/O metrics at GET /metrics
 """
 
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-import json
-from cart import add_to_cart, load_cart, load_products, checkout_cart, clear_cart
+import os
+import sys
+
+# The shared service_metrics and service_storage packages live next to this service's directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from service_metrics import install_metrics
+from cart import add_to_cart, load_cart, load_products, save_products, checkout_cart, clear_cart
 
 app = FastAPI(
     title="Shopping Cart API",
     description="Simple e-commerce shopping cart management system",
     version="1.0.0"
 )
+install_metrics(app, "shopping_cart")
 
 class Product(BaseModel):
     """
@@ -63,13 +70,12 @@ def add_product(product: Product):
         HTTPException: If there's an error adding the product
     """
     try:
-        products = load_products()
+        products = load_products(for_update=True)
         if any(p['id'] == product.id for p in products):
             raise HTTPException(status_code=400, detail="Product ID already exists")
 
         products.append(product.dict())
-        with open('product.json', 'w') as f:
-            json.dump(products, f, indent=4)
+        save_products(products)
 
         return {"message": "Product added successfully", "product": product}
     except Exception as e:
@@ -9,20 +9,30 @@ Features:
     - Calculate average scores automatically
     - Assign grades based on averages
     - Store data persistently in JSON format
+    - Request latency and file I/O metrics at GET /metrics
 """
 
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-import json
 import os
+import sys
+
+# The shared service_metrics and service_storage packages live next to this service's directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from service_metrics import install_metrics
+from service_storage import load_json, read_json, save_json
 
 app = FastAPI(
     title="Student Management System",
     description="API for managing student records and grades",
     version="1.0.0"
 )
+install_metrics(app, "student")
 
-DATA_FILE = "students.json"
+# Stored next to this module unless STUDENTS_FILE points elsewhere
+DATA_FILE = os.environ.get(
+    "STUDENTS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "students.json")
+)
 
 class Student(BaseModel):
     """
@@ -60,17 +70,22 @@ def calculate_grade(avg: float) -> str:
     else:
         return "F"
 
-def load_students() -> list:
+def load_students(for_update: bool = False) -> list:
     """
     Load student records from JSON file.
 
+    Unless for_update is set, the list comes from the shared cache and must not
+    be modified.
+
+    Args:
+        for_update (bool): Return a private copy that may be modified and saved
+
     Returns:
         list: List of student records, empty list if file doesn't exist
     """
     if not os.path.exists(DATA_FILE):
         return []
-    with open(DATA_FILE, 'r') as f:
-        return json.load(f)
+    return load_json(DATA_FILE) if for_update else read_json(DATA_FILE)
 
 def save_students(data: list) -> None:
     """
@@ -79,8 +94,7 @@ def save_students(data: list) -> None:
     Args:
         data (list): List of student records to save
     """
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f, indent=4)
+    save_json(data, DATA_FILE)
 
 @app.post("/students/", 
     response_model=dict,
@@ -122,7 +136,7 @@ def add_student(student: Student):
         student.average = sum(scores) / len(scores)
         student.grade = calculate_grade(student.average)
 
-        data = load_students()
+        data = load_students(for_update=True)
         data.append(student.model_dump())
         save_students(data)
         return {"message": "Student added successfully"}
@@ -0,0 +1,192 @@
+"""
+Contacts API Memory Benchmark
+
+Measures how many bytes each contact costs the Contacts API in memory. The
+original service (a dictionary of contact dictionaries, with no search index) is
+compared with the current one: the packed CompactContacts store plus the
+ContactIndex built over it. The store and the index are also reported on their
+own.
+
+Every structure is measured twice:
+    - Python allocations, counted with tracemalloc while the structure is built,
+      so the numbers do not depend on allocator reuse or on what else the
+      process holds
+    - Resident set size (RSS) growth, measured in a fresh process for each
+      structure, which is what the machine actually has to provide
+
+The service total (store plus index) is what decides how many contacts fit on a
+machine. Pass --max-bytes-per-contact to exit with status 1 when its tracemalloc
+figure goes over a budget, for example in CI.
+
+Usage:
+    python benchmarks/contacts_memory.py
+    python benchmarks/contacts_memory.py --contacts 1000000
+    python benchmarks/contacts_memory.py --contacts 200000 --max-bytes-per-contact 800
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import string
+import subprocess
+import sys
+import tracemalloc
+
+CONTACTS_API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "contacts_api")
+sys.path.insert(0, CONTACTS_API_DIR)
+
+from compact_store import CompactContacts
+from search_index import ContactIndex
+from process_memory import current_rss, peak_rss
+
+def generate_contacts(count: int, seed: int = 1):
+    """
+    Yield realistic-looking contact records.
+
+    Args:
+        count (int): Number of contacts
+        seed (int): Random seed, so runs are comparable
+
+    Yields:
+        dict: Contact with name, phone and email
+    """
+    rng = random.Random(seed)
+    first = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8))).title() for _ in range(5000)]
+    last = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))).title() for _ in range(20000)]
+    for i in range(count):
+        given, family = rng.choice(first), rng.choice(last)
+        yield {
+            "name": f"{given} {family} {i}",
+            "phone": f"+1{rng.randint(10 ** 9, 10 ** 10 - 1)}",
+            "email": f"{given.lower()}.{family.lower()}{i}@example.com",
+        }
+
+def build_dict(count: int) -> dict:
+    """Build the original store: a dictionary of contact dictionaries."""
+    contacts = {}
+    for contact in generate_contacts(count):
+        contacts[contact["name"]] = contact
+    return contacts
+
+def build_compact(count: int) -> CompactContacts:
+    """Build the current store: packed CompactContacts rows."""
+    contacts = CompactContacts()
+    for contact in generate_contacts(count):
+        contacts[contact["name"]] = contact
+    return contacts
+
+def build_index(contacts) -> ContactIndex:
+    """Build the search index the service keeps over its store."""
+    index = ContactIndex()
+    index.rebuild(contacts)
+    return index
+
+def build_service(count: int) -> tuple:
+    """Build everything the current service holds: the store and its index."""
+    contacts = build_compact(count)
+    return contacts, build_index(contacts)
+
+def measure(build) -> int:
+    """
+    Return the bytes allocated (and still held) by build().
+
+    Args:
+        build: Function creating the structure to measure
+
+    Returns:
+        int: Bytes held by the structure
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+def rss_child(service: str, count: int) -> dict:
+    """
+    Build one service's contacts in this (fresh) process and report RSS growth.
+
+    Args:
+        service (str): "original" (dict of dicts) or "current" (store and index)
+        count (int): Number of contacts
+
+    Returns:
+        dict: RSS growth in bytes for the store, the index and in total, and
+            the peak RSS of the process
+    """
+    gc.collect()
+    start = current_rss()
+    if service == "original":
+        held = [build_dict(count)]
+    else:
+        held = [build_compact(count)]
+    gc.collect()
+    stored = current_rss()
+    if service == "current":
+        held.append(build_index(held[0]))
+        gc.collect()
+    indexed = current_rss()
+    return {
+        "store": stored - start,
+        "index": indexed - stored,
+        "total": indexed - start,
+        "peak": peak_rss(),
+    }
+
+def measure_rss(service: str, count: int) -> dict:
+    """Run rss_child() in a new interpreter, so earlier measurements do not skew it."""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--contacts", str(count), "--rss-child", service],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Measure bytes per contact")
+    parser.add_argument("--contacts", type=int, default=100000, help="number of contacts")
+    parser.add_argument("--max-bytes-per-contact", type=float, default=None,
+                        help="fail when the service total (tracemalloc) is above this")
+    parser.add_argument("--rss-child", choices=["original", "current"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    count = args.contacts
+
+    if args.rss_child:
+        print(json.dumps(rss_child(args.rss_child, count)))
+        return
+
+    dict_bytes = measure(lambda: build_dict(count))
+    compact_bytes = measure(lambda: build_compact(count))
+    compact = build_compact(count)
+    index_bytes = measure(lambda: build_index(compact))
+    del compact
+    total_bytes = measure(lambda: build_service(count))
+
+    original_rss = measure_rss("original", count)
+    service_rss = measure_rss("current", count)
+
+    print(f"{'structure':<34}{'MB':>10}{'bytes/contact':>16}{'RSS MB':>10}{'RSS bytes/contact':>20}")
+    for label, total, rss in (
+        ("original: dict of dicts", dict_bytes, original_rss["total"]),
+        ("CompactContacts", compact_bytes, service_rss["store"]),
+        ("ContactIndex", index_bytes, service_rss["index"]),
+        ("current: store + index", total_bytes, service_rss["total"]),
+    ):
+        print(f"{label:<34}{total / 2 ** 20:>10.1f}{total / count:>16.1f}{rss / 2 ** 20:>10.1f}{rss / count:>20.1f}")
+    print(
+        f"current service uses {total_bytes / dict_bytes:.2f}x the memory of the original "
+        f"({service_rss['total'] / max(original_rss['total'], 1):.2f}x by RSS); "
+        f"peak RSS {service_rss['peak'] / 2 ** 20:.0f} MB vs {original_rss['peak'] / 2 ** 20:.0f} MB"
+    )
+
+    if args.max_bytes_per_contact is not None and total_bytes / count > args.max_bytes_per_contact:
+        sys.exit(
+            f"current service uses {total_bytes / count:.1f} bytes per contact, "
+            f"over the budget of {args.max_bytes_per_contact:g}"
+        )
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,165 @@
+"""
+Notes API File I/O Benchmark
+
+Compares the ways the Notes API can run its file I/O under a burst of concurrent
+requests:
+
+    sync       - the original sync handlers: plain "def" endpoints doing their
+                 I/O inline, each request on FastAPI's shared threadpool
+    threadpool - async handlers sending each file operation to FastAPI's
+                 shared threadpool
+    executor   - async handlers sending each file operation to the dedicated,
+                 tunable notes I/O pool
+
+The sync handlers are rebuilt here on the same note store and search index, so
+only the concurrency model differs between the modes.
+
+Requests are sent in-process through httpx's ASGI transport, so no network or
+running server is needed. Half of the requests update a note and half read one;
+the content cache is disabled so every read goes to disk.
+
+Usage:
+    python benchmarks/notes_io.py
+    python benchmarks/notes_io.py --requests 5000 --concurrency 1000 --notes 200
+    NOTES_IO_WORKERS=64 python benchmarks/notes_io.py --modes executor
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+
+NOTES_API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "notes_api")
+
+def load_notes_api(workdir: str):
+    """
+    Import the Notes API with its notes directory inside workdir.
+
+    Args:
+        workdir (str): Directory to keep the notes in
+
+    Returns:
+        tuple: (main, file_io) modules of the Notes API
+    """
+    os.environ["NOTES_DIR"] = os.path.join(workdir, "notes")
+    sys.path.insert(0, NOTES_API_DIR)
+    import main
+    import file_io
+    return main, file_io
+
+def build_sync_app(main) -> FastAPI:
+    """
+    Build the read and update endpoints as the original sync handlers.
+
+    Args:
+        main: The Notes API main module, whose note store and search index are used
+
+    Returns:
+        FastAPI: An application serving GET and PUT /notes/{title}
+    """
+    app = FastAPI()
+
+    @app.get("/notes/{title}")
+    def read_note(title: str):
+        try:
+            content, _, _ = main.note_store.read(title)
+        except FileNotFoundError:
+            return {"message": f"Note '{title}' not found"}
+        return {"title": title, "content": content}
+
+    @app.put("/notes/{title}")
+    def update_note(title: str, note: main.Note):
+        try:
+            main.note_store.write(title, note.content, False)
+        except FileNotFoundError:
+            return {"message": f"Note '{title}' not found"}
+        main.search_index.add(title, note.content)
+        return {"message": f"Note '{title}' updated successfully!"}
+
+    return app
+
+async def run_mode(main, file_io, mode: str, total: int, concurrency: int, notes: int, body: str) -> dict:
+    """
+    Send a burst of mixed read/update requests in one I/O mode.
+
+    Args:
+        main: The Notes API main module
+        file_io: The Notes API file_io module
+        mode (str): "sync", "threadpool" or "executor"
+        total (int): Number of requests to send
+        concurrency (int): Maximum number of requests in flight
+        notes (int): Number of distinct notes to spread requests over
+        body (str): Note content used for updates
+
+    Returns:
+        dict: Throughput, latency percentiles and error count
+    """
+    file_io.IO_MODE = "threadpool" if mode == "sync" else mode
+    app = build_sync_app(main) if mode == "sync" else main.app
+    latencies = []
+    errors = 0
+    limit = asyncio.Semaphore(concurrency)
+
+    seed_transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=seed_transport, base_url="http://notes") as client:
+        for i in range(notes):
+            await client.post(f"/notes/bench-{i}", json={"content": body})
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://notes") as client:
+
+        async def one(i: int) -> None:
+            nonlocal errors
+            async with limit:
+                start = time.perf_counter()
+                if i % 2:
+                    response = await client.get(f"/notes/bench-{i % notes}")
+                else:
+                    response = await client.put(f"/notes/bench-{i % notes}", json={"content": body})
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200 or "Error" in response.json().get("message", ""):
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "requests": total,
+        "seconds": round(elapsed, 3),
+        "req_per_sec": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        "errors": errors,
+    }
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark Notes API file I/O modes")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per mode")
+    parser.add_argument("--concurrency", type=int, default=1000, help="requests in flight")
+    parser.add_argument("--notes", type=int, default=100, help="distinct notes")
+    parser.add_argument("--size", type=int, default=4096, help="note size in bytes")
+    parser.add_argument("--modes", nargs="+", default=["sync", "threadpool", "executor"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        main, file_io = load_notes_api(workdir)
+        # Disable the content cache so reads exercise the I/O path
+        main.note_cache.max_bytes = 0
+        body = "x" * args.size
+
+        print(f"{'mode':<12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for mode in args.modes:
+            result = asyncio.run(run_mode(main, file_io, mode, args.requests, args.concurrency, args.notes, body))
+            print(f"{result['mode']:<12}{result['req_per_sec']:>10}{result['p50_ms']:>10}{result['p99_ms']:>10}{result['errors']:>8}")
+
+if __name__ == "__main__":
+    main_cli()
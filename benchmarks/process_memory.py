@@ -0,0 +1,42 @@
+"""
+Process Memory Helpers for the Benchmarks
+
+Reads the resident set size (RSS) of the current process, now and at its peak.
+The peak comes from VmHWM in /proc, because getrusage()'s ru_maxrss on Linux
+carries over the parent's peak through fork and exec: a benchmark process
+started by a runner that once used 800 MB would report at least that much.
+ru_maxrss is only used where /proc is not available.
+
+Functions:
+    current_rss(): Resident set size of this process in bytes
+    peak_rss(): Peak resident set size of this process in bytes
+"""
+
+import os
+import sys
+
+def current_rss() -> int:
+    """
+    Return the resident set size of this process in bytes.
+
+    Uses /proc on Linux and falls back to the peak RSS elsewhere.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return peak_rss()
+
+def peak_rss() -> int:
+    """Return the peak resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
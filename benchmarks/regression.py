@@ -0,0 +1,536 @@
+"""
+End-to-End Performance Regression Suite
+
+Drives every endpoint of all five APIs in-process through httpx's ASGI transport
+(no server or network needed) against data sets of different sizes, and records
+for each endpoint:
+
+    req_per_sec            - throughput
+    p50_ms / p99_ms        - latency percentiles
+    read_bytes_per_req     - bytes read from data files per request
+    written_bytes_per_req  - bytes written to data files per request
+    errors                 - failed requests, including 200 responses whose
+                             body reports a failure ("Contact not found")
+
+and for each service and size the startup time (import plus data load) and the
+peak RSS of the process.
+
+Every (service, size) case runs in its own Python process, so peak RSS and
+caches belong to that case only. The data is generated in a temporary directory
+before the process starts and the API is pointed at it through its data path
+environment variables; the files in the repository are never touched.
+
+Results are written as JSON. Keep one as a baseline and compare later runs
+against it; compare exits with status 1 when a metric got worse by more than the
+threshold, or when an endpoint has more errors than before, so it can gate a
+change.
+
+Byte counters come from the shared service_metrics package and cover the JSON
+and text file helpers; files sent with sendfile (note downloads) are not counted.
+
+Usage:
+    pip install httpx
+    python benchmarks/regression.py run --output baseline.json
+    python benchmarks/regression.py run --sizes 10 1000 100000 1000000 --output big.json
+    python benchmarks/regression.py run --services contacts notes --output current.json
+    python benchmarks/regression.py compare baseline.json current.json --threshold 0.15
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from process_memory import peak_rss
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCHMARKS_DIR, "..", "app")
+
+# Service name -> directory of the API inside app/
+SERVICES = {
+    "job_tracker": "job_tracker_api",
+    "notes": "notes_api",
+    "contacts": "contacts_api",
+    "shopping_cart": "shopping_cart_api",
+    "student": "student_api",
+}
+
+DEFAULT_SIZES = [10, 1000, 100000]
+
+# Records whose names or titles the endpoints refer to
+SAMPLE_SIZE = 1000
+
+# Metric -> 1 if a higher value is worse, -1 if a lower value is worse
+ENDPOINT_METRICS = {
+    "req_per_sec": -1,
+    "p99_ms": 1,
+    "read_bytes_per_req": 1,
+    "written_bytes_per_req": 1,
+    "errors": 1,
+}
+# Metrics where any increase is a regression, whatever the threshold
+STRICT_METRICS = {"errors"}
+CASE_METRICS = {
+    "startup_seconds": 1,
+    "peak_rss_mb": 1,
+}
+
+# Several APIs report failures in a 200 response, e.g. {"message": "Contact not found"}
+ERROR_MESSAGE = re.compile(r"error|not found|already exists|is empty|busy", re.IGNORECASE)
+
+STATUSES = ("pending", "accepted", "rejected", "interviewing")
+
+def _vocabulary(count: int = 2000) -> list:
+    rng = random.Random(2)
+    return ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(count)]
+
+def _write_json_list(path: str, records) -> None:
+    """Write records as a JSON list one at a time, so large sets are never held in memory."""
+    with open(path, "w") as f:
+        f.write("[")
+        for i, record in enumerate(records):
+            f.write(",\n" if i else "\n")
+            f.write(json.dumps(record))
+        f.write("\n]")
+
+# Data generation, one function per service. Each fills data_dir with size
+# records and returns the environment variables pointing the API at them.
+
+def seed_job_tracker(data_dir: str, size: int) -> dict:
+    path = os.path.join(data_dir, "applications.json")
+    _write_json_list(path, (
+        {"name": f"applicant-{i}", "company": f"company-{i % 500}", "position": "Developer", "status": STATUSES[i % 4]}
+        for i in range(size)
+    ))
+    return {"APPLICATIONS_FILE": path}
+
+def seed_student(data_dir: str, size: int) -> dict:
+    path = os.path.join(data_dir, "students.json")
+    _write_json_list(path, (
+        {"name": f"student-{i}", "subject_scores": {"Math": i % 100, "English": (i * 7) % 100},
+         "average": (i % 100 + (i * 7) % 100) / 2, "grade": "C"}
+        for i in range(size)
+    ))
+    return {"STUDENTS_FILE": path}
+
+def seed_shopping_cart(data_dir: str, size: int) -> dict:
+    products = os.path.join(data_dir, "product.json")
+    _write_json_list(products, (
+        {"id": i + 1, "name": f"product-{i + 1}", "price": round(1 + (i % 1000) / 10, 2)}
+        for i in range(size)
+    ))
+    cart = os.path.join(data_dir, "cart_data.json")
+    _write_json_list(cart, ())
+    return {"PRODUCTS_FILE": products, "CART_FILE": cart}
+
+def seed_contacts(data_dir: str, size: int) -> dict:
+    # Imported here: it loads the Contacts API modules, which would shadow the
+    # Notes API's search_index in a notes case
+    from contacts_memory import generate_contacts
+
+    snapshot = os.path.join(data_dir, "contacts_snapshot.jsonl")
+    with open(snapshot, "w") as f:
+        for contact in generate_contacts(size):
+            f.write(json.dumps([contact["name"], contact]) + "\n")
+    return {
+        "CONTACTS_STORAGE": "wal",
+        "CONTACTS_SNAPSHOT_FILE": snapshot,
+        "CONTACTS_WAL_FILE": os.path.join(data_dir, "contacts.wal"),
+    }
+
+def seed_notes(data_dir: str, size: int) -> dict:
+    notes_dir = os.path.join(data_dir, "notes")
+    os.makedirs(notes_dir)
+    words = _vocabulary()
+    rng = random.Random(3)
+    for i in range(size):
+        with open(os.path.join(notes_dir, f"note-{i}.txt"), "w") as f:
+            f.write(" ".join(rng.choices(words, k=80)))
+    return {"NOTES_DIR": notes_dir}
+
+# Endpoints, one function per service. Each returns a list of endpoints to run in
+# order; "request" turns a request number into (method, url, httpx arguments).
+# "count_of" caps an endpoint at the number of requests another one made, so
+# deletes only target records that the create endpoint added. "setup" turns a
+# request number into requests sent just before it, untimed, so for example
+# every checkout has a cart to check out.
+
+def job_tracker_endpoints(size: int) -> list:
+    return [
+        {"name": "GET /applications/", "request": lambda i: ("GET", "/applications/", {})},
+        {"name": "GET /applications/search", "request": lambda i: ("GET", f"/applications/search?status={STATUSES[i % 4]}", {})},
+        {"name": "POST /applications/", "request": lambda i: ("POST", "/applications/", {"json": {
+            "name": f"bench-{i}", "company": "Bench Corp", "position": "Tester", "status": "pending"}})},
+    ]
+
+def student_endpoints(size: int) -> list:
+    return [
+        {"name": "GET /students/", "request": lambda i: ("GET", "/students/", {})},
+        {"name": "GET /students/{name}", "request": lambda i: ("GET", f"/students/student-{(i * 7919) % size}", {})},
+        {"name": "POST /students/", "request": lambda i: ("POST", "/students/", {"json": {
+            "name": f"bench-{i}", "subject_scores": {"Math": 70, "English": 60}}})},
+    ]
+
+def shopping_cart_endpoints(size: int) -> list:
+    return [
+        {"name": "GET /products/", "request": lambda i: ("GET", "/products/", {})},
+        {"name": "POST /products/", "request": lambda i: ("POST", "/products/", {"json": {
+            "id": size + 1 + i, "name": f"bench-{i}", "price": 9.99, "description": "benchmark"}})},
+        {"name": "POST /cart/add", "request": lambda i: ("POST", "/cart/add", {"json": {
+            "product_id": (i * 7919) % size + 1, "quantity": 1}})},
+        {"name": "GET /cart/", "request": lambda i: ("GET", "/cart/", {})},
+        {"name": "POST /cart/checkout", "request": lambda i: ("POST", "/cart/checkout", {}),
+         "setup": lambda i: [("POST", "/cart/add", {"json": {"product_id": (i * 7919) % size + 1, "quantity": 1}})]},
+        {"name": "POST /cart/clear", "request": lambda i: ("POST", "/cart/clear", {})},
+    ]
+
+def contacts_endpoints(size: int) -> list:
+    from contacts_memory import generate_contacts
+
+    names = [contact["name"] for contact in generate_contacts(min(size, SAMPLE_SIZE))]
+    first_names = [name.split()[0].lower() for name in names]
+
+    def typo(word: str) -> str:
+        # Swap two letters, which the fuzzy search must still match
+        return word[1] + word[0] + word[2:]
+
+    def contact(i: int) -> dict:
+        return {"name": f"Bench Contact {i}", "phone": f"+4420{i:07d}", "email": f"bench{i}@example.com"}
+
+    return [
+        {"name": "GET /contacts/", "request": lambda i: ("GET", "/contacts/", {})},
+        {"name": "GET /contacts/?name=", "request": lambda i: ("GET", "/contacts/", {"params": {"name": names[i % len(names)]}})},
+        {"name": "GET /contacts/search prefix", "request": lambda i: ("GET", "/contacts/search", {"params": {"q": first_names[i % len(names)][:3]}})},
+        {"name": "GET /contacts/search fuzzy", "request": lambda i: ("GET", "/contacts/search", {"params": {"q": typo(first_names[i % len(names)])}})},
+        {"name": "POST /contacts/", "request": lambda i: ("POST", "/contacts/", {"json": contact(i)})},
+        {"name": "PUT /contacts/{name}", "request": lambda i: ("PUT", f"/contacts/{names[i % len(names)]}", {"json": {
+            "name": names[i % len(names)], "phone": f"+4420{i:07d}", "email": f"updated{i}@example.com"}})},
+        {"name": "DELETE /contacts/{name}", "count_of": "POST /contacts/",
+         "request": lambda i: ("DELETE", f"/contacts/Bench Contact {i}", {})},
+    ]
+
+def notes_endpoints(size: int) -> list:
+    words = _vocabulary()
+    sample = min(size, SAMPLE_SIZE)
+    body = " ".join(words[:80])
+
+    return [
+        {"name": "GET /notes/{title}", "request": lambda i: ("GET", f"/notes/note-{(i * 7919) % sample}", {})},
+        {"name": "GET /notes/search", "request": lambda i: ("GET", "/notes/search", {"params": {"q": words[i % len(words)]}})},
+        {"name": "GET /notes/search phrase", "request": lambda i: ("GET", "/notes/search", {"params": {"q": f'"{words[i % 50]} {words[i % 50 + 1]}"'}})},
+        {"name": "GET /notes/cache/stats", "request": lambda i: ("GET", "/notes/cache/stats", {})},
+        {"name": "POST /notes/{title}", "request": lambda i: ("POST", f"/notes/bench-{i}", {"json": {"content": body}})},
+        {"name": "PUT /notes/{title}", "request": lambda i: ("PUT", f"/notes/note-{i % sample}", {"json": {"content": f"{body} {i}"}})},
+        {"name": "PUT /notes/{title}/raw", "request": lambda i: ("PUT", f"/notes/bench-raw-{i}/raw", {"content": body.encode()})},
+        {"name": "GET /notes/{title}/raw", "request": lambda i: ("GET", f"/notes/note-{(i * 7919) % sample}/raw", {})},
+        {"name": "DELETE /notes/{title}", "count_of": "POST /notes/{title}",
+         "request": lambda i: ("DELETE", f"/notes/bench-{i}", {})},
+    ]
+
+SEEDERS = {
+    "job_tracker": seed_job_tracker,
+    "notes": seed_notes,
+    "contacts": seed_contacts,
+    "shopping_cart": seed_shopping_cart,
+    "student": seed_student,
+}
+
+ENDPOINTS = {
+    "job_tracker": job_tracker_endpoints,
+    "notes": notes_endpoints,
+    "contacts": contacts_endpoints,
+    "shopping_cart": shopping_cart_endpoints,
+    "student": student_endpoints,
+}
+
+def _is_error(response) -> bool:
+    """Return True for an error status, or a 200 whose message reports a failure."""
+    if response.status_code >= 400:
+        return True
+    if "json" not in response.headers.get("content-type", ""):
+        return False
+    try:
+        body = response.json()
+    except ValueError:
+        return False
+    return isinstance(body, dict) and isinstance(body.get("message"), str) and bool(ERROR_MESSAGE.search(body["message"]))
+
+def _file_bytes(counter) -> dict:
+    totals = {"read": 0, "write": 0}
+    for (op, _), value in list(counter.values.items()):
+        totals[op] += value
+    return totals
+
+async def run_endpoint(client, endpoint: dict, count: int, max_seconds: float, concurrency: int, file_bytes) -> dict:
+    """
+    Send requests to one endpoint until count requests or max_seconds have passed.
+
+    Time and file bytes spent on an endpoint's setup requests are left out of
+    its results. Such endpoints run one request at a time, so each request sees
+    the state its own setup left (there is one shared cart, for example).
+
+    Args:
+        client (httpx.AsyncClient): Client bound to the API
+        endpoint (dict): The endpoint, from one of the *_endpoints functions
+        count (int): Maximum number of requests
+        max_seconds (float): Time after which no new request is started
+        concurrency (int): Requests in flight at once
+        file_bytes: Counter of file bytes by operation (service_metrics FILE_BYTES)
+
+    Returns:
+        dict: Requests, throughput, latency percentiles, bytes per request and errors
+    """
+    latencies = []
+    errors = 0
+    sent = 0
+    setup_seconds = 0.0
+    setup_bytes = {"read": 0, "write": 0}
+    if "setup" in endpoint:
+        concurrency = 1
+
+    if endpoint["name"].startswith("GET"):
+        # One unmeasured request so first-call setup does not land in p99
+        method, url, kwargs = endpoint["request"](0)
+        await client.request(method, url, **kwargs)
+
+    before = _file_bytes(file_bytes)
+    deadline = time.perf_counter() + max_seconds
+
+    async def setup(number: int) -> None:
+        nonlocal setup_seconds
+        start = time.perf_counter()
+        bytes_before = _file_bytes(file_bytes)
+        for method, url, kwargs in endpoint["setup"](number):
+            await client.request(method, url, **kwargs)
+        bytes_after = _file_bytes(file_bytes)
+        for op in setup_bytes:
+            setup_bytes[op] += bytes_after[op] - bytes_before[op]
+        setup_seconds += time.perf_counter() - start
+
+    async def worker() -> None:
+        nonlocal errors, sent
+        while sent < count and (sent == 0 or time.perf_counter() < deadline):
+            number = sent
+            sent += 1
+            if "setup" in endpoint:
+                await setup(number)
+            method, url, kwargs = endpoint["request"](number)
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            if _is_error(response):
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start - setup_seconds
+    after = _file_bytes(file_bytes)
+    for op in setup_bytes:
+        after[op] -= setup_bytes[op]
+
+    latencies.sort()
+    total = len(latencies)
+    return {
+        "requests": total,
+        "req_per_sec": round(total / elapsed, 1),
+        "p50_ms": round(latencies[total // 2] * 1000, 3),
+        "p99_ms": round(latencies[max(int(total * 0.99) - 1, 0)] * 1000, 3),
+        "read_bytes_per_req": round((after["read"] - before["read"]) / total, 1),
+        "written_bytes_per_req": round((after["write"] - before["write"]) / total, 1),
+        "errors": errors,
+    }
+
+def _peak_rss_mb() -> float:
+    # Not ru_maxrss, which includes the peak of the runner that started this process
+    return round(peak_rss() / 2 ** 20, 1)
+
+def run_case(service: str, size: int, requests: int, max_seconds: float, concurrency: int) -> dict:
+    """
+    Import one API against already generated data and benchmark all its endpoints.
+
+    Runs inside the per-case process; the data path environment variables are
+    already set by the parent.
+
+    Args:
+        service (str): Service name, a key of SERVICES
+        size (int): Number of records the data was generated with
+        requests (int): Maximum requests per endpoint
+        max_seconds (float): Maximum seconds per endpoint
+        concurrency (int): Requests in flight at once
+
+    Returns:
+        dict: Startup time, peak RSS and per-endpoint results
+    """
+    import httpx
+
+    sys.path.insert(0, os.path.join(APP_DIR, SERVICES[service]))
+    start = time.perf_counter()
+    import main
+    startup_seconds = time.perf_counter() - start
+    from service_metrics.file_stats import FILE_BYTES
+
+    async def run_all() -> dict:
+        results = {}
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for endpoint in ENDPOINTS[service](size):
+                count = requests
+                if "count_of" in endpoint:
+                    count = results[endpoint["count_of"]]["requests"]
+                results[endpoint["name"]] = await run_endpoint(
+                    client, endpoint, count, max_seconds, concurrency, FILE_BYTES
+                )
+        return results
+
+    endpoints = asyncio.run(run_all())
+    return {
+        "service": service,
+        "size": size,
+        "startup_seconds": round(startup_seconds, 3),
+        "peak_rss_mb": _peak_rss_mb(),
+        "endpoints": endpoints,
+    }
+
+def print_case(case: dict) -> None:
+    print(f"\n{case['service']} x {case['size']}: startup {case['startup_seconds']} s, peak RSS {case['peak_rss_mb']} MB")
+    print(f"  {'endpoint':<32}{'reqs':>7}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'read B':>12}{'written B':>12}{'errors':>8}")
+    for name, result in case["endpoints"].items():
+        print(
+            f"  {name:<32}{result['requests']:>7}{result['req_per_sec']:>10}{result['p50_ms']:>10}"
+            f"{result['p99_ms']:>10}{result['read_bytes_per_req']:>12}{result['written_bytes_per_req']:>12}{result['errors']:>8}"
+        )
+
+def run_suite(args) -> None:
+    """Run every selected (service, size) case in its own process and save the results."""
+    suite = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "requests": args.requests,
+            "max_seconds": args.max_seconds,
+            "concurrency": args.concurrency,
+        },
+        "cases": {},
+    }
+    for service in args.services:
+        for size in args.sizes:
+            with tempfile.TemporaryDirectory() as data_dir:
+                env = dict(os.environ, **SEEDERS[service](data_dir, size))
+                output = subprocess.run(
+                    [
+                        sys.executable, os.path.abspath(__file__), "case",
+                        "--service", service, "--size", str(size),
+                        "--requests", str(args.requests), "--max-seconds", str(args.max_seconds),
+                        "--concurrency", str(args.concurrency),
+                    ],
+                    env=env, cwd=data_dir, capture_output=True, text=True
+                )
+            if output.returncode != 0:
+                sys.exit(f"{service} x {size} failed:\n{output.stderr}")
+            case = json.loads(output.stdout.strip().splitlines()[-1])
+            suite["cases"][f"{service}/{size}"] = case
+            print_case(case)
+
+    with open(args.output, "w") as f:
+        json.dump(suite, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+def _worse_by(metric_direction: int, baseline: float, current: float) -> float:
+    """Relative change of a metric, positive when it got worse."""
+    if baseline == 0:
+        return float("inf") if current * metric_direction > 0 else 0.0
+    return metric_direction * (current - baseline) / baseline
+
+def compare_results(baseline: dict, current: dict, threshold: float) -> list:
+    """
+    Compare two result files.
+
+    Args:
+        baseline (dict): Earlier results
+        current (dict): New results
+        threshold (float): Relative change (0.15 = 15%) beyond which a metric is
+            reported; metrics in STRICT_METRICS are reported on any change
+
+    Returns:
+        list: (case, endpoint, metric, baseline, current, change) tuples, where
+            change is positive for regressions and negative for improvements
+    """
+    changes = []
+    for key, base_case in baseline["cases"].items():
+        case = current["cases"].get(key)
+        if case is None:
+            continue
+        pairs = [("", metric, direction, base_case, case) for metric, direction in CASE_METRICS.items()]
+        for name, base_result in base_case["endpoints"].items():
+            result = case["endpoints"].get(name)
+            if result is not None:
+                pairs.extend((name, metric, direction, base_result, result) for metric, direction in ENDPOINT_METRICS.items())
+        for name, metric, direction, base_values, values in pairs:
+            change = _worse_by(direction, base_values[metric], values[metric])
+            if abs(change) > threshold or (metric in STRICT_METRICS and change != 0):
+                changes.append((key, name, metric, base_values[metric], values[metric], change))
+    return changes
+
+def compare_suite(args) -> None:
+    """Print metrics that changed beyond the threshold; exit with 1 on any regression."""
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    changes = compare_results(baseline, current, args.threshold)
+    regressions = [change for change in changes if change[-1] > 0]
+    print(f"{'case':<24}{'endpoint':<32}{'metric':<24}{'baseline':>12}{'current':>12}{'change':>10}")
+    for key, name, metric, base_value, value, change in changes:
+        label = "REGRESSION" if change > 0 else "improved"
+        percent = f"{(value - base_value) / base_value:+.1%}" if base_value else "new"
+        print(f"{key:<24}{name or '-':<32}{metric:<24}{base_value:>12}{value:>12}{percent:>10}  {label}")
+    print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+    if regressions:
+        sys.exit(1)
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end performance regression suite for all APIs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="benchmark every endpoint and save the results")
+    run.add_argument("--services", nargs="+", choices=list(SERVICES), default=list(SERVICES))
+    run.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="records per data set")
+    run.add_argument("--requests", type=int, default=200, help="maximum requests per endpoint")
+    run.add_argument("--max-seconds", type=float, default=5.0, help="maximum seconds per endpoint")
+    run.add_argument("--concurrency", type=int, default=1, help="requests in flight")
+    run.add_argument("--output", default="benchmark_results.json", help="where to write the results")
+
+    compare = commands.add_parser("compare", help="flag regressions between two result files")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.15, help="relative change to report (0.15 = 15%%)")
+
+    case = commands.add_parser("case", help=argparse.SUPPRESS)
+    case.add_argument("--service", choices=list(SERVICES), required=True)
+    case.add_argument("--size", type=int, required=True)
+    case.add_argument("--requests", type=int, required=True)
+    case.add_argument("--max-seconds", type=float, required=True)
+    case.add_argument("--concurrency", type=int, required=True)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run_suite(args)
+    elif args.command == "compare":
+        compare_suite(args)
+    else:
+        result = run_case(args.service, args.size, args.requests, args.max_seconds, args.concurrency)
+        print(json.dumps(result))
+
+if __name__ == "__main__":
+    main_cli()